@@ -0,0 +1,211 @@
+"""
+NumPy engine that steps many games at once.
+
+Boards are held as an (N, 4, 4) uint8 array of log2 ranks, the same
+nibbles as bitboard.py. Moves pack every line into a 16-bit row and go
+through the row tables in tables.py, so the merge-once-per-move rule of
+Game.move is shared rather than reimplemented.
+"""
+import numpy as np
+
+from . import bitboard
+from .tables import get_tables
+
+_SHIFTS = np.array([0, 4, 8, 12], dtype=np.uint32)
+_VERTICAL = np.array([True, True, False, False])
+_REVERSED = np.array([False, True, False, True])
+_WIN_RANK = bitboard.rank(2048)
+
+
+def _numpy_tables():
+    tables = get_tables()
+    return (np.frombuffer(tables.left, dtype=np.uint16),
+            np.frombuffer(tables.right, dtype=np.uint16),
+            np.frombuffer(tables.left_score, dtype=np.uint32),
+            np.frombuffer(tables.right_score, dtype=np.uint32))
+
+
+def pack_rows(lines):
+    """
+    Pack the last axis of a (..., 4) rank array into 16-bit rows.
+    """
+    return (lines.astype(np.uint32) << _SHIFTS).sum(axis=-1, dtype=np.uint32)
+
+
+def unpack_rows(rows):
+    """
+    Unpack 16-bit rows into a (..., 4) uint8 rank array.
+    """
+    return ((rows[..., None] >> _SHIFTS) & 0xF).astype(np.uint8)
+
+
+def move_boards(boards, directions):
+    """
+    Apply one move to each board.
+
+    Args:
+        boards: (N, 4, 4) uint8 array of log2 ranks
+        directions: (N,) int array of indexes into bitboard.DIRECTIONS
+
+    Returns:
+        A tuple of the (N, 4, 4) boards after the moves, an (N,) bool
+        array of boards that changed and an (N,) array of score gained.
+    """
+    left, right, left_score, right_score = _numpy_tables()
+    directions = np.asarray(directions)
+    vertical = _VERTICAL[directions][:, None, None]
+    reverse = _REVERSED[directions][:, None]
+
+    lines = np.where(vertical, boards.transpose(0, 2, 1), boards)
+    rows = pack_rows(lines)
+    moved_rows = np.where(reverse, right[rows], left[rows])
+    score = np.where(reverse, right_score[rows], left_score[rows]).sum(
+        axis=1, dtype=np.uint64)
+    lines = unpack_rows(moved_rows)
+    result = np.where(vertical, lines.transpose(0, 2, 1), lines)
+    changed = (moved_rows != rows).any(axis=1)
+    return result, changed, score
+
+
+def can_move(boards):
+    """
+    Returns:
+        An (N,) bool array, True where any move changes the board.
+    """
+    empty = (boards == 0).any(axis=(1, 2))
+    horizontal = (boards[:, :, 1:] == boards[:, :, :-1]).any(axis=(1, 2))
+    vertical = (boards[:, 1:, :] == boards[:, :-1, :]).any(axis=(1, 2))
+    return empty | horizontal | vertical
+
+
+def legal_moves(boards, out=None):
+    """
+    Find which directions change each board.
+
+    Args:
+        boards: (N, 4, 4) uint8 array of log2 ranks
+        out: Optional (N, 4) bool array written in place
+
+    Returns:
+        An (N, 4) bool array, columns in bitboard.DIRECTIONS order.
+    """
+    if out is None:
+        out = np.empty((len(boards), 4), dtype=bool)
+    for column, axis in ((0, 1), (2, 2)):
+        first = boards[:, :-1, :] if axis == 1 else boards[:, :, :-1]
+        second = boards[:, 1:, :] if axis == 1 else boards[:, :, 1:]
+        merge = (first == second) & (first != 0)
+        # up/left: a tile after an empty cell, down/right: before one
+        towards_start = merge | ((first == 0) & (second != 0))
+        towards_end = merge | ((second == 0) & (first != 0))
+        towards_start.any(axis=(1, 2), out=out[:, column])
+        towards_end.any(axis=(1, 2), out=out[:, column + 1])
+    return out
+
+
+class BatchGame:
+    def __init__(self, n, seed=None, four_probability=0.5):
+        """
+        Initiate n empty boards and a NumPy random generator.
+
+        Args:
+            n: Number of games
+            seed: Seed of the random generator
+            four_probability: Chance that a spawned tile is a 4
+        """
+        self.boards = np.zeros((n, 4, 4), dtype=np.uint8)
+        self.rng = np.random.default_rng(seed)
+        self.four_probability = four_probability
+
+    @classmethod
+    def from_boards(cls, boards, seed=None, four_probability=0.5):
+        """
+        Build a batch from packed bitboard ints.
+        """
+        batch = cls(len(boards), seed, four_probability)
+        for index, board in enumerate(boards):
+            for cell in range(16):
+                batch.boards[index, cell // 4, cell % 4] = \
+                    (board >> (4 * cell)) & bitboard.CELL_MASK
+        return batch
+
+    def to_boards(self):
+        """
+        Returns:
+            A list of packed bitboard ints, one per game.
+        """
+        rows = pack_rows(self.boards).astype(np.uint64)
+        packed = (rows[:, 0] | rows[:, 1] << np.uint64(16) |
+                  rows[:, 2] << np.uint64(32) | rows[:, 3] << np.uint64(48))
+        return [int(board) for board in packed]
+
+    def __len__(self):
+        return len(self.boards)
+
+    def initialize(self, mask=None):
+        """
+        Clear the selected boards and fill in 2 empty cells of each with
+        2 or 4, as Game.initialize does.
+
+        Args:
+            mask: (N,) bool array of boards to reset, all boards if None
+        """
+        if mask is None:
+            mask = np.ones(len(self.boards), dtype=bool)
+        self.boards[mask] = 0
+        self.fill_empty_cell(mask)
+        self.fill_empty_cell(mask)
+
+    def fill_empty_cell(self, mask):
+        """
+        Fill in one random empty cell of every selected board with 2 or 4.
+        Boards without an empty cell are left untouched.
+
+        Args:
+            mask: (N,) bool array of boards to fill
+        """
+        flat = self.boards.reshape(len(self.boards), 16)
+        empty = flat == 0
+        mask = mask & empty.any(axis=1)
+        # The empty cell with the largest random key is a uniform choice
+        keys = np.where(empty, self.rng.random(empty.shape), -1.0)
+        cells = keys.argmax(axis=1)
+        ranks = np.where(self.rng.random(len(flat)) < self.four_probability,
+                         2, 1).astype(np.uint8)
+        rows = np.flatnonzero(mask)
+        flat[rows, cells[rows]] = ranks[rows]
+
+    def move(self, directions):
+        """
+        Move every board into its direction and fill in an empty cell of
+        each board that moved, like Game.move.
+
+        Args:
+            directions: (N,) int array of indexes into bitboard.DIRECTIONS
+
+        Returns:
+            A tuple of an (N,) bool array of boards that moved and an
+            (N,) array of score gained.
+        """
+        boards, moved, score = move_boards(self.boards, directions)
+        self.boards[...] = boards
+        self.fill_empty_cell(moved)
+        return moved, score
+
+    def valid_move_exists(self):
+        """
+        Returns:
+            An (N,) bool array, True where valid moves exist.
+        """
+        return can_move(self.boards)
+
+    def is_game_over(self):
+        """
+        Check which games are over.
+
+        Returns:
+            A tuple of (N,) bool arrays: done and won.
+            Done is True where 2048 is found or no possible moves exist.
+        """
+        won = (self.boards >= _WIN_RANK).any(axis=(1, 2))
+        return won | ~self.valid_move_exists(), won
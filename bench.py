@@ -0,0 +1,194 @@
+"""
+Throughput benchmarks of the move engine, game-over checks and full games.
+
+Run it as a module, e.g.
+    python -m 2048.bench --output new.json
+    python -m 2048.bench --compare old.json new.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from .evaluation import evaluate
+from .main import Game
+from .ntuple import NTupleNetwork
+from .runner import PreferenceBot, play_game
+from .variants import get_shape
+
+DEFAULT_THRESHOLD = 0.1
+# Board sizes of the variant benchmarks, capped at VARIANT_STEPS moves
+VARIANTS = ((3, 3), (5, 5), (6, 6), (8, 8))
+VARIANT_STEPS = 2000
+
+
+def mid_game_boards(count=256, seed=0):
+    """
+    Collect realistic boards by sampling seeded PreferenceBot games.
+
+    Returns:
+        A list of count packed boards.
+    """
+    boards = []
+    game_index = 0
+    while len(boards) < count:
+        game = Game(seed=seed + game_index)
+        game.initialize()
+        bot = PreferenceBot()
+        game_index += 1
+        while len(boards) < count:
+            direction = bot.best_move(game.board)
+            if direction is None or not game.move(direction):
+                break
+            boards.append(game.board)
+    return boards
+
+
+def _time_calls(function, boards, repeat):
+    # Best of repeat passes over all boards, in calls per second
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for board in boards:
+            function(board)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(boards) / best if best else 0.0
+
+
+def _game_method(name):
+    game = Game(seed=0)
+    method = getattr(game, name)
+
+    def call(board):
+        game.board = board
+        return method()
+    return call
+
+
+def _fill_empty_cell():
+    game = Game(seed=0)
+
+    def call(board):
+        game.board = board
+        return game.fill_empty_cell(game.empty_cells())
+    return call
+
+
+def run_benchmarks(board_count=256, repeat=5, games=20):
+    """
+    Run every benchmark.
+
+    Args:
+        board_count: Number of mid-game boards per micro benchmark
+        repeat: Number of passes, the fastest one is reported
+        games: Number of full games of the game benchmark
+
+    Returns:
+        A dict mapping benchmark names to calls (or games) per second.
+    """
+    boards = mid_game_boards(board_count)
+    results = {}
+    for name in ("up", "down", "left", "right", "is_game_over",
+                 "valid_move_exists", "empty_cells"):
+        results[name] = _time_calls(_game_method(name), boards, repeat)
+    results["fill_empty_cell"] = _time_calls(_fill_empty_cell(), boards,
+                                             repeat)
+    evaluate(boards[0])  # Build the tables outside the timed loop
+    results["evaluate"] = _time_calls(evaluate, boards, repeat)
+    results["ntuple_best_move"] = _time_calls(NTupleNetwork().best_move,
+                                              boards, repeat)
+
+    moves = 0
+    start = time.perf_counter()
+    for seed in range(games):
+        game = Game(seed=seed)
+        game.initialize()
+        moves += play_game(PreferenceBot(), game).steps
+    elapsed = time.perf_counter() - start
+    results["games"] = games / elapsed
+    results["game_moves"] = moves / elapsed
+
+    for rows, cols in VARIANTS:
+        name = "game_moves_{}x{}".format(rows, cols)
+        results[name] = _variant_moves(rows, cols, games)
+    return results
+
+
+def _variant_moves(rows, cols, games):
+    # Moves per second of the preference bot on a rows x cols board
+    get_shape(rows, cols).successors(0)  # Build the tables untimed
+    moves = 0
+    start = time.perf_counter()
+    for seed in range(games):
+        game = Game(seed=seed, rows=rows, cols=cols, win_tile=32768)
+        game.initialize()
+        bot = PreferenceBot(game.shape)
+        moves += play_game(bot, game, max_steps=VARIANT_STEPS).steps
+    return moves / (time.perf_counter() - start)
+
+
+def compare(old, new, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two benchmark runs.
+
+    Args:
+        old: Results dict of the baseline run
+        new: Results dict of the candidate run
+        threshold: Relative slowdown reported as a regression
+
+    Returns:
+        A list of (name, old, new, ratio, regressed) tuples for the
+        benchmarks present in both runs.
+    """
+    rows = []
+    for name in sorted(set(old) & set(new)):
+        ratio = new[name] / old[name] if old[name] else float('inf')
+        rows.append((name, old[name], new[name], ratio,
+                     ratio < 1.0 - threshold))
+    return rows
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark 2048.")
+    parser.add_argument("--output", help="write the results to this JSON "
+                                         "file")
+    parser.add_argument("--boards", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help="relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        rows = compare(_load(args.compare[0]), _load(args.compare[1]),
+                       args.threshold)
+        regressed = False
+        for name, old, new, ratio, slower in rows:
+            print("{:<20}{:>14.0f}{:>14.0f}{:>8.2f}x{}".format(
+                name, old, new, ratio, "  REGRESSION" if slower else ""))
+            regressed = regressed or slower
+        return 1 if regressed else 0
+
+    results = run_benchmarks(args.boards, args.repeat, args.games)
+    for name, rate in results.items():
+        print("{:<20}{:>14.0f}/sec".format(name, rate))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
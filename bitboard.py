@@ -0,0 +1,342 @@
+"""
+64-bit bitboard representation of the 4x4 grid.
+
+Every cell is stored as a 4-bit nibble holding log2 of the tile value
+(0 for an empty cell), so the whole board fits in a single int.
+Cell [row, col] lives at bit offset 4 * (4 * row + col), i.e. row 0 is
+the lowest 16 bits and column 0 is the lowest nibble of each row.
+"""
+from .tables import get_tables
+
+ROW_MASK = 0xFFFF
+CELL_MASK = 0xF
+MAX_RANK = 15
+_LOW_BITS = 0x1111111111111111
+
+
+def rank(value):
+    """
+    Convert a tile value into its log2 nibble.
+
+    Args:
+        value: Tile value, 0 or a power of two up to 2 ** 15
+
+    Returns:
+        log2 of value, 0 for an empty cell.
+    """
+    if not value:
+        return 0
+    nibble = value.bit_length() - 1
+    if value != 1 << nibble or not 0 < nibble <= MAX_RANK:
+        raise ValueError('{} is not a valid tile value!'.format(value))
+    return nibble
+
+
+def value(nibble):
+    """
+    Convert a log2 nibble back into its tile value.
+
+    Returns:
+        Tile value, 0 for an empty cell.
+    """
+    return 1 << nibble if nibble else 0
+
+
+def encode(grid):
+    """
+    Pack a 4x4 list of tile values into a bitboard.
+
+    Args:
+        grid: 4x4 list of lists of tile values
+
+    Returns:
+        The packed board as an int.
+    """
+    board = 0
+    for row in range(4):
+        for col in range(4):
+            board |= rank(grid[row][col]) << (4 * (4 * row + col))
+    return board
+
+
+def decode(board):
+    """
+    Unpack a bitboard into a 4x4 list of tile values.
+
+    Returns:
+        4x4 list of lists of tile values.
+    """
+    return [[value((board >> (4 * (4 * row + col))) & CELL_MASK)
+             for col in range(4)] for row in range(4)]
+
+
+def get_tile(board, row, col):
+    """
+    Read the tile value at [row, col].
+    """
+    return value((board >> (4 * (4 * row + col))) & CELL_MASK)
+
+
+def set_tile(board, row, col, tile):
+    """
+    Write the tile value at [row, col].
+
+    Returns:
+        The updated board.
+    """
+    shift = 4 * (4 * row + col)
+    return (board & ~(CELL_MASK << shift)) | (rank(tile) << shift)
+
+
+def transpose(board):
+    """
+    Swap rows and columns of the board, so column moves can reuse the
+    row routines.
+    """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def move_row_left(row):
+    """
+    Slide a packed 16-bit row towards column 0.
+    A tile merges at most once per move.
+
+    Returns:
+        The packed row after the move.
+    """
+    return get_tables().left[row]
+
+
+def _apply(board, table):
+    return (table[board & ROW_MASK] |
+            table[(board >> 16) & ROW_MASK] << 16 |
+            table[(board >> 32) & ROW_MASK] << 32 |
+            table[board >> 48] << 48)
+
+
+def _score(board, table):
+    return (table[board & ROW_MASK] +
+            table[(board >> 16) & ROW_MASK] +
+            table[(board >> 32) & ROW_MASK] +
+            table[board >> 48])
+
+
+def move_left(board):
+    """
+    Returns:
+        The board after a left move.
+    """
+    return _apply(board, get_tables().left)
+
+
+def move_right(board):
+    """
+    Returns:
+        The board after a right move.
+    """
+    return _apply(board, get_tables().right)
+
+
+def move_up(board):
+    """
+    Returns:
+        The board after an up move.
+    """
+    return transpose(_apply(transpose(board), get_tables().left))
+
+
+def move_down(board):
+    """
+    Returns:
+        The board after a down move.
+    """
+    return transpose(_apply(transpose(board), get_tables().right))
+
+
+DIRECTIONS = ("up", "down", "left", "right")
+
+MOVES = {
+    "up": move_up,
+    "down": move_down,
+    "left": move_left,
+    "right": move_right,
+}
+
+
+def execute_move(board, direction):
+    """
+    Apply a move and report the score gained by its merges.
+
+    Args:
+        board: Packed board
+        direction: One of up, down, left, right
+
+    Returns:
+        A tuple of the board after the move and the score gained.
+    """
+    tables = get_tables()
+    if direction == "left":
+        return (_apply(board, tables.left),
+                _score(board, tables.left_score))
+    if direction == "right":
+        return (_apply(board, tables.right),
+                _score(board, tables.right_score))
+    transposed = transpose(board)
+    if direction == "up":
+        return (transpose(_apply(transposed, tables.left)),
+                _score(transposed, tables.left_score))
+    if direction == "down":
+        return (transpose(_apply(transposed, tables.right)),
+                _score(transposed, tables.right_score))
+    raise ValueError('{} is not a valid direction!'.format(direction))
+
+
+def successors(board):
+    """
+    Apply all four moves at once, sharing the row extraction and the
+    transpose between them.
+
+    Returns:
+        A tuple of (board, score) pairs in DIRECTIONS order.
+    """
+    tables = get_tables()
+    left, right = tables.left, tables.right
+    left_score, right_score = tables.left_score, tables.right_score
+    rows = (board & ROW_MASK, (board >> 16) & ROW_MASK,
+            (board >> 32) & ROW_MASK, board >> 48)
+    transposed = transpose(board)
+    cols = (transposed & ROW_MASK, (transposed >> 16) & ROW_MASK,
+            (transposed >> 32) & ROW_MASK, transposed >> 48)
+    return (
+        (transpose(left[cols[0]] | left[cols[1]] << 16 |
+                   left[cols[2]] << 32 | left[cols[3]] << 48),
+         left_score[cols[0]] + left_score[cols[1]] +
+         left_score[cols[2]] + left_score[cols[3]]),
+        (transpose(right[cols[0]] | right[cols[1]] << 16 |
+                   right[cols[2]] << 32 | right[cols[3]] << 48),
+         right_score[cols[0]] + right_score[cols[1]] +
+         right_score[cols[2]] + right_score[cols[3]]),
+        (left[rows[0]] | left[rows[1]] << 16 |
+         left[rows[2]] << 32 | left[rows[3]] << 48,
+         left_score[rows[0]] + left_score[rows[1]] +
+         left_score[rows[2]] + left_score[rows[3]]),
+        (right[rows[0]] | right[rows[1]] << 16 |
+         right[rows[2]] << 32 | right[rows[3]] << 48,
+         right_score[rows[0]] + right_score[rows[1]] +
+         right_score[rows[2]] + right_score[rows[3]]),
+    )
+
+
+class Board(int):
+    """
+    An immutable, hashable packed board.
+
+    A Board is an int holding the 64-bit bitboard, so it costs no more
+    than the plain int, hashes and compares like it, and can be passed to
+    every function of this module.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Pack a 4x4 list of tile values into a Board.
+        """
+        return cls(encode(grid))
+
+    @property
+    def grid(self):
+        """
+        A new 4x4 list of lists of tile values.
+        """
+        return decode(self)
+
+    def tile(self, row, col):
+        """
+        Read the tile value at [row, col].
+        """
+        return get_tile(self, row, col)
+
+    def with_tile(self, row, col, tile):
+        """
+        Returns:
+            A new Board with the tile value at [row, col] replaced.
+        """
+        return Board(set_tile(self, row, col, tile))
+
+    def move(self, direction):
+        """
+        Returns:
+            A tuple of the Board after the move and the score gained.
+        """
+        board, score = execute_move(self, direction)
+        return Board(board), score
+
+    def __repr__(self):
+        return 'Board({:#018x})'.format(int(self))
+
+
+def empty_mask(board):
+    """
+    Returns:
+        A mask with the lowest bit of every empty cell's nibble set.
+    """
+    occupied = board | board >> 1
+    occupied |= occupied >> 2
+    return ~occupied & _LOW_BITS
+
+
+def empty_cells(board):
+    """
+    Find indexes of all empty cells of the board.
+
+    Returns:
+        A list of tuples of indexes of empty cells
+    """
+    cells = []
+    mask = empty_mask(board)
+    while mask:
+        bit = mask & -mask
+        cells.append(divmod(bit.bit_length() >> 2, 4))
+        mask ^= bit
+    return cells
+
+
+def max_rank(board):
+    """
+    Returns:
+        The largest log2 nibble on the board.
+    """
+    table = get_tables().max_rank
+    return max(table[board & ROW_MASK], table[(board >> 16) & ROW_MASK],
+               table[(board >> 32) & ROW_MASK], table[board >> 48])
+
+
+def _has_zero_nibble(x, mask):
+    # Fold every nibble into its lowest bit, then look for a cleared bit
+    x |= x >> 2
+    x |= x >> 1
+    return x & mask != mask
+
+
+def can_move(board):
+    """
+    Scan the board for an empty cell or two equal neighbours.
+
+    Returns:
+        True if any of the four moves changes the board.
+    """
+    if _has_zero_nibble(board, _LOW_BITS):
+        return True
+    # Equal horizontal neighbours, column 3 does not wrap to the next row
+    if _has_zero_nibble(board ^ (board >> 4), 0x0111011101110111):
+        return True
+    # Equal vertical neighbours
+    return _has_zero_nibble(board ^ (board >> 16), 0x0000111111111111)
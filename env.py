@@ -0,0 +1,74 @@
+"""
+Gym-style vectorized environment over BatchGame.
+
+Observations are the (N, 4, 4) uint8 log2 boards of the underlying
+BatchGame, returned without copying. Rewards, done flags and legal
+action masks live in preallocated arrays that every step overwrites in
+place, so callers must copy anything they want to keep.
+Actions index bitboard.DIRECTIONS: 0 up, 1 down, 2 left, 3 right.
+"""
+import numpy as np
+
+from .batch import BatchGame, legal_moves
+
+
+class VectorEnv:
+    def __init__(self, num_envs, seed=None, four_probability=0.5,
+                 auto_reset=True):
+        """
+        Args:
+            num_envs: Number of games stepped together
+            seed: Seed of the spawn generator
+            four_probability: Chance that a spawned tile is a 4
+            auto_reset: Restart finished games at the end of step
+        """
+        self.num_envs = num_envs
+        self.games = BatchGame(num_envs, seed, four_probability)
+        self.auto_reset = auto_reset
+        self.observations = self.games.boards
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.won = np.zeros(num_envs, dtype=bool)
+        self.legal_actions = np.zeros((num_envs, 4), dtype=bool)
+
+    def reset(self):
+        """
+        Start a new game in every environment.
+
+        Returns:
+            A tuple of the observations and the legal action masks.
+        """
+        self.games.initialize()
+        self.rewards[:] = 0
+        self.dones[:] = False
+        self.won[:] = False
+        legal_moves(self.observations, out=self.legal_actions)
+        return self.observations, self.legal_actions
+
+    def step(self, actions):
+        """
+        Apply one action per environment, as Game.move does.
+        An illegal action leaves its board unchanged with no reward.
+
+        Args:
+            actions: (N,) int array of indexes into bitboard.DIRECTIONS
+
+        Returns:
+            A tuple of observations, rewards (merge score), done flags,
+            legal action masks and an info dict. When auto_reset is on
+            and games finished, info["final_observations"] holds a copy
+            of their last boards and the observations already show the
+            new games.
+        """
+        _, score = self.games.move(actions)
+        self.rewards[:] = score
+        done, won = self.games.is_game_over()
+        self.dones[:] = done
+        self.won[:] = won
+        info = {}
+        if self.auto_reset and done.any():
+            info["final_observations"] = self.observations[done].copy()
+            self.games.initialize(done)
+        legal_moves(self.observations, out=self.legal_actions)
+        return (self.observations, self.rewards, self.dones,
+                self.legal_actions, info)
@@ -0,0 +1,164 @@
+"""
+Table-driven heuristic board evaluation.
+
+Every heuristic term is precomputed for all 2 ** 16 packed rows. A board
+is scored as the weighted terms of its four rows plus its four columns,
+read through bitboard.transpose, so an evaluation is eight lookups into
+one combined table. Each term is unchanged when a row is reversed, so
+the evaluation is symmetric under rotations and reflections, as
+TranspositionTable assumes.
+"""
+from array import array
+
+from .bitboard import ROW_MASK, transpose
+from .tables import ROW_COUNT
+
+TERMS = ("empty", "monotonicity", "smoothness", "merges", "corner")
+
+DEFAULT_WEIGHTS = {
+    "base": 200000.0,
+    "empty": 270.0,
+    "monotonicity": -47.0,
+    "smoothness": -10.0,
+    "merges": 700.0,
+    "corner": 20.0,
+}
+
+
+def row_terms(row):
+    """
+    Compute the heuristic terms of one packed row.
+
+    Returns:
+        A dict mapping every name of TERMS to its value:
+        empty: number of empty cells
+        monotonicity: smallest of the increasing and decreasing
+            violations, weighted by rank ** 4
+        smoothness: sum of rank gaps between neighbouring tiles
+        merges: number of tiles that could merge with a neighbour
+        corner: largest rank if it sits at either end of the row
+    """
+    ranks = [(row >> (4 * col)) & 0xF for col in range(4)]
+    tiles = [rank for rank in ranks if rank]
+
+    merges = 0
+    previous = 0
+    counter = 0
+    for rank in tiles:
+        if rank == previous:
+            counter += 1
+        elif counter:
+            merges += 1 + counter
+            counter = 0
+        previous = rank
+    if counter:
+        merges += 1 + counter
+
+    increasing = decreasing = 0
+    for left, right in zip(ranks, ranks[1:]):
+        if left > right:
+            increasing += left ** 4 - right ** 4
+        else:
+            decreasing += right ** 4 - left ** 4
+
+    top = max(ranks)
+    return {
+        "empty": 4 - len(tiles),
+        "monotonicity": min(increasing, decreasing),
+        "smoothness": sum(abs(left - right)
+                          for left, right in zip(tiles, tiles[1:])),
+        "merges": merges,
+        "corner": top if top and top in (ranks[0], ranks[3]) else 0,
+    }
+
+
+def build_term_tables():
+    """
+    Returns:
+        A dict mapping every name of TERMS to an array of its value for
+        all 2 ** 16 rows.
+    """
+    term_tables = {term: array('d', bytes(8 * ROW_COUNT)) for term in TERMS}
+    for row in range(ROW_COUNT):
+        for term, value in row_terms(row).items():
+            term_tables[term][row] = value
+    return term_tables
+
+
+_term_tables = None
+
+
+def get_term_tables():
+    """
+    Return the process-wide term tables, building them on first use.
+    """
+    global _term_tables
+    if _term_tables is None:
+        _term_tables = build_term_tables()
+    return _term_tables
+
+
+class Evaluator:
+    def __init__(self, weights=None):
+        """
+        Combine the term tables into one weighted row table.
+
+        Args:
+            weights: Dict overriding entries of DEFAULT_WEIGHTS; "base"
+                is added once per row and column
+        """
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            unknown = set(weights) - set(DEFAULT_WEIGHTS)
+            if unknown:
+                raise ValueError('unknown weights: {}'.format(
+                    ', '.join(sorted(unknown))))
+            self.weights.update(weights)
+        term_tables = get_term_tables()
+        base = self.weights["base"]
+        table = array('d', [base]) * ROW_COUNT
+        for term in TERMS:
+            weight = self.weights[term]
+            if weight:
+                column = term_tables[term]
+                for row in range(ROW_COUNT):
+                    table[row] += weight * column[row]
+        self.table = table
+
+    def __call__(self, board):
+        """
+        Returns:
+            The heuristic score of a packed board.
+        """
+        table = self.table
+        transposed = transpose(board)
+        return (table[board & ROW_MASK] +
+                table[(board >> 16) & ROW_MASK] +
+                table[(board >> 32) & ROW_MASK] +
+                table[board >> 48] +
+                table[transposed & ROW_MASK] +
+                table[(transposed >> 16) & ROW_MASK] +
+                table[(transposed >> 32) & ROW_MASK] +
+                table[transposed >> 48])
+
+
+_default = None
+
+
+def get_evaluator():
+    """
+    Return the process-wide Evaluator of DEFAULT_WEIGHTS, building its
+    table on first use.
+    """
+    global _default
+    if _default is None:
+        _default = Evaluator()
+    return _default
+
+
+def evaluate(board):
+    """
+    Score a board with DEFAULT_WEIGHTS.
+    A plain function, so it can be sent to worker processes.
+    """
+    return (_default or get_evaluator())(board)
@@ -0,0 +1,215 @@
+"""
+Expectimax search player.
+
+Max nodes try the four moves, chance nodes average over every empty cell
+filled with 2 or 4, as Game.fill_empty_cell does. Successors come from
+bitboard.execute_move, so the search never builds Game objects.
+"""
+import time
+
+from . import bitboard
+from .evaluation import evaluate, get_evaluator
+from .metrics import LatencyRecorder
+
+
+
+def spawn_outcomes(four_probability=0.5):
+    """
+    Returns:
+        The (nibble, probability) pairs of a spawned 2 and 4, leaving
+        out the one that never spawns.
+    """
+    return tuple((nibble, probability) for nibble, probability
+                 in ((1, 1.0 - four_probability), (2, four_probability))
+                 if probability)
+
+
+def default_evaluate(board):
+    """
+    Score a leaf board with the table-driven heuristic of evaluation.py.
+    """
+    return evaluate(board)
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search once its deadline has passed.
+    """
+
+
+class ExpectimaxBot:
+    def __init__(self, depth=2, evaluate=default_evaluate, table=None,
+                 min_probability=0.0, four_probability=0.5):
+        """
+        Args:
+            depth: Number of player moves searched ahead
+            evaluate: Function scoring a packed leaf board
+            table: Optional TranspositionTable caching chance nodes
+            min_probability: Chance nodes reached with a lower cumulative
+                probability are evaluated instead of searched
+            four_probability: Chance that a spawned tile is a 4, as in
+                the game played
+        """
+        if evaluate is default_evaluate:
+            # Build the tables now rather than inside the first search
+            get_evaluator()
+        self.depth = depth
+        self.evaluate = evaluate
+        self.table = table
+        self.min_probability = min_probability
+        self.four_probability = four_probability
+        self.spawns = spawn_outcomes(four_probability)
+        self.deadline = None
+        self.nodes = 0
+        self.search_time = 0.0
+        self.latency = LatencyRecorder()
+
+    def nodes_per_second(self):
+        """
+        Returns:
+            Search throughput since the bot was created, 0 if unknown.
+        """
+        if not self.search_time:
+            return 0.0
+        return self.nodes / self.search_time
+
+    def best_move(self, board):
+        """
+        Search the board and pick the best direction.
+
+        Args:
+            board: Packed board
+
+        Returns:
+            One of up, down, left, right, or None if no move is possible.
+        """
+        start = time.perf_counter()
+        direction = self.search_root(board, self.depth)
+        self.record_latency(time.perf_counter() - start)
+        return direction
+
+    def record_latency(self, seconds):
+        """
+        Account one best_move call in the throughput and latency stats.
+        """
+        self.search_time += seconds
+        self.latency.record(seconds)
+
+    def search_root(self, board, depth):
+        """
+        Returns:
+            The direction with the best expected value searched depth
+            deep, or None if no move is possible.
+        """
+        best_direction = None
+        best_value = float('-inf')
+        for direction, (moved, score) in zip(bitboard.DIRECTIONS,
+                                             bitboard.successors(board)):
+            if moved == board:
+                continue
+            value = score + self.chance_value(moved, depth - 1)
+            if value > best_value:
+                best_direction, best_value = direction, value
+        return best_direction
+
+    def max_value(self, board, depth, probability=1.0):
+        """
+        Returns:
+            The best expected value over the four moves of the board.
+        """
+        self.nodes += 1
+        best = None
+        for moved, score in bitboard.successors(board):
+            if moved == board:
+                continue
+            value = score + self.chance_value(moved, depth - 1, probability)
+            if best is None or value > best:
+                best = value
+        # A board without moves ends the game
+        return 0.0 if best is None else best
+
+    def chance_value(self, board, depth, probability=1.0):
+        """
+        Returns:
+            The expected value over all tile spawns of the board, or its
+            evaluation once the depth or the probability is exhausted.
+        """
+        self.nodes += 1
+        if depth <= 0 or probability < self.min_probability:
+            return self.evaluate(board)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        cells = bitboard.empty_cells(board)
+        if not cells:
+            return self.evaluate(board)
+        if self.table is not None:
+            cached = self.table.get(board, depth)
+            if cached is not None:
+                return cached
+        cell_probability = probability / len(cells)
+        total = 0.0
+        for row, col in cells:
+            shift = 4 * (4 * row + col)
+            for nibble, spawn_probability in self.spawns:
+                total += spawn_probability * self.max_value(
+                    board | nibble << shift, depth,
+                    cell_probability * spawn_probability)
+        value = total / len(cells)
+        if self.table is not None:
+            self.table.put(board, depth, value)
+        return value
+
+
+class IterativeDeepeningBot(ExpectimaxBot):
+    def __init__(self, time_limit=0.05, max_depth=8,
+                 evaluate=default_evaluate, table=None,
+                 min_probability=1e-4, four_probability=0.5):
+        """
+        Anytime expectimax that deepens until a per-move deadline.
+
+        Args:
+            time_limit: Wall-clock budget of one move, in seconds
+            max_depth: Deepest search ever attempted
+            evaluate: Function scoring a packed leaf board
+            table: Optional TranspositionTable caching chance nodes
+            min_probability: Chance nodes reached with a lower cumulative
+                probability are evaluated instead of searched
+            four_probability: Chance that a spawned tile is a 4
+        """
+        super().__init__(depth=max_depth, evaluate=evaluate, table=table,
+                         min_probability=min_probability,
+                         four_probability=four_probability)
+        self.time_limit = time_limit
+        self.last_depth = 0
+
+    def best_move(self, board):
+        """
+        Deepen the search one level at a time until the deadline and
+        return the best direction of the deepest completed search.
+
+        Returns:
+            One of up, down, left, right, or None if no move is possible.
+        """
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        best_direction = None
+        self.last_depth = 0
+        try:
+            for depth in range(1, self.depth + 1):
+                direction = self.search_root(board, depth)
+                if direction is None:
+                    break
+                best_direction = direction
+                self.last_depth = depth
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        if best_direction is None:
+            # Not even depth 1 finished, fall back to any legal move
+            for direction in bitboard.DIRECTIONS:
+                if bitboard.MOVES[direction](board) != board:
+                    best_direction = direction
+                    break
+        self.record_latency(time.perf_counter() - start)
+        return best_direction
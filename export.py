@@ -0,0 +1,197 @@
+"""
+Streaming export of training transitions to sharded .npy files.
+
+Transitions (board, action, reward, next_board, done) are buffered in a
+NumPy structured array and written in bulk as fixed-size .npy shards,
+described by a small manifest.json. Boards are stored as packed 64-bit
+bitboards; unpack_boards expands them into (N, 4, 4) log2 ranks.
+Shards are loaded with mmap, so reading them copies nothing.
+"""
+import json
+import os
+
+import numpy as np
+
+from . import bitboard
+from .main import Game
+
+TRANSITION_DTYPE = np.dtype([
+    ("board", "<u8"),
+    ("action", "u1"),
+    ("reward", "<u4"),
+    ("next_board", "<u8"),
+    ("done", "?"),
+])
+MANIFEST = "manifest.json"
+_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+_ACTIONS = {direction: index
+            for index, direction in enumerate(bitboard.DIRECTIONS)}
+
+
+def unpack_boards(boards):
+    """
+    Expand packed bitboards into an (N, 4, 4) uint8 array of log2 ranks.
+    """
+    boards = np.asarray(boards, dtype=np.uint64)
+    cells = (boards[..., None] >> _SHIFTS) & np.uint64(0xF)
+    return cells.astype(np.uint8).reshape(boards.shape + (4, 4))
+
+
+class TransitionWriter:
+    def __init__(self, directory, shard_size=1 << 20):
+        """
+        Args:
+            directory: Output directory, created if missing. The shards
+                of a manifest already there are kept and appended to.
+            shard_size: Number of transitions per shard
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.buffer = np.zeros(shard_size, dtype=TRANSITION_DTYPE)
+        self.count = 0
+        self.shards = self._read_manifest()
+
+    def _read_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            manifest = json.load(f)
+        if np.dtype([tuple(field) for field in manifest["dtype"]]) \
+                != TRANSITION_DTYPE:
+            raise ValueError('{} holds transitions of another dtype!'.format(
+                self.directory))
+        return manifest["shards"]
+
+    def add(self, board, action, reward, next_board, done):
+        """
+        Buffer one transition, flushing a shard once the buffer is full.
+        """
+        self.buffer[self.count] = (board, action, reward, next_board, done)
+        self.count += 1
+        if self.count == self.shard_size:
+            self.flush()
+
+    def add_batch(self, transitions):
+        """
+        Buffer a structured array of TRANSITION_DTYPE in bulk.
+        """
+        start = 0
+        while start < len(transitions):
+            take = min(self.shard_size - self.count, len(transitions) - start)
+            self.buffer[self.count:self.count + take] = \
+                transitions[start:start + take]
+            self.count += take
+            start += take
+            if self.count == self.shard_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the buffered transitions as the next shard.
+        """
+        if not self.count:
+            return
+        name = "shard-{:05d}.npy".format(len(self.shards))
+        np.save(os.path.join(self.directory, name), self.buffer[:self.count])
+        self.shards.append({"file": name, "count": self.count})
+        self.count = 0
+        self.write_manifest()
+
+    def write_manifest(self):
+        manifest = {
+            "dtype": [list(field) for field in TRANSITION_DTYPE.descr],
+            "shard_size": self.shard_size,
+            "total": sum(shard["count"] for shard in self.shards),
+            "shards": self.shards,
+        }
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        """
+        Flush the last, possibly short, shard.
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def export_game(writer, bot, game=None, max_steps=None):
+    """
+    Play one game with a bot and export every transition.
+
+    Args:
+        writer: TransitionWriter receiving the transitions
+        bot: Object whose best_move(board) returns a direction
+        game: Game to play, a freshly initialized one if None
+        max_steps: Stop after this many moves if set
+
+    Returns:
+        The number of transitions exported.
+    """
+    if game is None:
+        game = Game()
+        game.initialize()
+    steps = 0
+    while max_steps is None or steps < max_steps:
+        board = game.board
+        direction = bot.best_move(board)
+        if direction is None:
+            break
+        _, reward = bitboard.execute_move(board, direction)
+        if not game.move(direction):
+            break
+        steps += 1
+        done, _ = game.is_game_over()
+        writer.add(board, _ACTIONS[direction], reward, game.board, done)
+        if done:
+            break
+    return steps
+
+
+class TransitionDataset:
+    def __init__(self, directory):
+        """
+        Open the shards listed in a manifest as read-only memory maps.
+        """
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self._shards = [np.load(os.path.join(directory, shard["file"]),
+                                mmap_mode="r")
+                        for shard in self.manifest["shards"]]
+        self.offsets = np.cumsum([0] + [len(shard)
+                                        for shard in self._shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transition index out of range")
+        shard = int(np.searchsorted(self.offsets, index, side="right")) - 1
+        return self._shards[shard][index - self.offsets[shard]]
+
+    def __iter__(self):
+        """
+        Yields:
+            Every transition, in order.
+        """
+        for shard in self._shards:
+            yield from shard
+
+    def shards(self):
+        """
+        Returns:
+            The list of shards as memory-mapped structured arrays.
+        """
+        return list(self._shards)
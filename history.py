@@ -0,0 +1,145 @@
+"""
+Compact undo/redo history of a game.
+
+Every move is stored as one byte, encoded like records.py: the index
+into DIRECTIONS in bits 0-1, the spawned cell in bits 2-5 and 1 in
+bit 6 for a 4. A full packed board and its score are kept every
+KEYFRAME_INTERVAL positions in an array('Q') and an array('I'), so a
+10,000 move game takes about 12 kB. Undo replays at most
+KEYFRAME_INTERVAL - 1 moves from the keyframe before it, and merge
+scores are recomputed along the way. Redo replays one move. Redone
+positions replay the stored spawns exactly. Making a new move after an
+undo drops the redo tail.
+"""
+from array import array
+
+from .bitboard import DIRECTIONS, Board
+from .variants import get_shape
+
+KEYFRAME_INTERVAL = 64
+_DIRECTION_INDEX = {direction: index
+                    for index, direction in enumerate(DIRECTIONS)}
+
+
+class History:
+    def __init__(self, board=0, score=0, shape=None):
+        """
+        Args:
+            board: Packed board of the first position
+            score: Score of the first position
+            shape: variants.Shape of the boards, 4x4 if None; at most
+                16 cells
+        """
+        self.shape = shape or get_shape()
+        if self.shape.cells > 16:
+            raise ValueError('history supports boards of at most 16 cells')
+        self.moves = bytearray()
+        self.keyframes = array('Q', [board])
+        self.keyframe_scores = array('I', [score])
+        self.position = 0
+        self._board = board
+        self._score = score
+
+    def record(self, direction, moved_board, board, score):
+        """
+        Append a move after the current position, dropping any positions
+        that could have been redone.
+
+        Args:
+            direction: Direction of the move
+            moved_board: Board after the move, before the spawn
+            board: Board after the spawn
+            score: Score after the move
+        """
+        position = self.position
+        if position < len(self.moves):
+            del self.moves[position:]
+            del self.keyframes[position // KEYFRAME_INTERVAL + 1:]
+            del self.keyframe_scores[position // KEYFRAME_INTERVAL + 1:]
+        cell = ((board ^ moved_board).bit_length() - 1) // 4
+        nibble = (board >> (4 * cell)) & 0xF
+        self.moves.append(_DIRECTION_INDEX[direction] | cell << 2 |
+                          (nibble - 1) << 6)
+        self.position = position = position + 1
+        self._board = board
+        self._score = score
+        if not position % KEYFRAME_INTERVAL:
+            self.keyframes.append(board)
+            self.keyframe_scores.append(score)
+
+    def _replay(self, board, score, start, stop):
+        # Apply the stored moves start to stop - 1 to a position
+        execute_move = self.shape.execute_move
+        for code in self.moves[start:stop]:
+            board, gained = execute_move(board, DIRECTIONS[code & 3])
+            score += gained
+            board |= ((code >> 6) + 1) << (4 * ((code >> 2) & 0xF))
+        return board, score
+
+    def _seek(self, position):
+        # Rebuild a position from the keyframe at or before it
+        keyframe = position // KEYFRAME_INTERVAL
+        return self._replay(self.keyframes[keyframe],
+                            self.keyframe_scores[keyframe],
+                            keyframe * KEYFRAME_INTERVAL, position)
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.moves)
+
+    def undo(self):
+        """
+        Step back one position.
+
+        Returns:
+            A tuple of the Board and score of the new position, or None
+            if there is nothing to undo.
+        """
+        if not self.can_undo():
+            return None
+        self.position -= 1
+        self._board, self._score = self._seek(self.position)
+        return self.current()
+
+    def redo(self):
+        """
+        Step forward one undone position.
+
+        Returns:
+            A tuple of the Board and score of the new position, or None
+            if there is nothing to redo.
+        """
+        if not self.can_redo():
+            return None
+        self._board, self._score = self._replay(
+            self._board, self._score, self.position, self.position + 1)
+        self.position += 1
+        return self.current()
+
+    def current(self):
+        """
+        Returns:
+            A tuple of the Board and score of the current position.
+        """
+        return Board(self._board), self._score
+
+    def __len__(self):
+        return len(self.moves) + 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('history index out of range')
+        return Board(self._seek(index)[0])
+
+    def nbytes(self):
+        """
+        Returns:
+            The size of the stored moves and keyframes in bytes.
+        """
+        return (len(self.moves) +
+                len(self.keyframes) * self.keyframes.itemsize +
+                len(self.keyframe_scores) * self.keyframe_scores.itemsize)
@@ -0,0 +1,111 @@
+"""
+Opt-in hot-path instrumentation for Game.
+
+A GameProfiler attached to a Game shadows the instrumented methods with
+counting or timing wrappers on that instance only. Games without a
+profiler run the plain class methods, so disabled instrumentation costs
+nothing.
+"""
+import json
+import time
+
+from .bitboard import DIRECTIONS
+from .metrics import LatencyHistogram
+
+# valid_move_exists no longer deep copies the grid; its call count
+# stands in for the former deepcopy count.
+COUNTED = ("can_move", "move_cell", "valid_move_exists", "is_game_over",
+           "fill_empty_cell", "spawn_tile", "empty_cells")
+
+
+class GameProfiler:
+    def __init__(self, stream_path=None, interval=10.0):
+        """
+        Args:
+            stream_path: File that snapshots are appended to as JSON
+                lines while attached games run, None to disable
+            interval: Seconds between two streamed snapshots
+        """
+        self.counters = dict.fromkeys(COUNTED, 0)
+        self.histograms = {direction: LatencyHistogram()
+                           for direction in DIRECTIONS}
+        self.stream_path = stream_path
+        self.interval = interval
+        self.last_flush = time.monotonic()
+        self.started = time.time()
+
+    def attach(self, game):
+        """
+        Instrument one Game instance.
+        """
+        for name in COUNTED:
+            setattr(game, name, self._counted(name, getattr(game, name)))
+        for direction in DIRECTIONS:
+            setattr(game, direction,
+                    self._timed(direction, getattr(game, direction)))
+        return game
+
+    def detach(self, game):
+        """
+        Restore the plain methods of one Game instance.
+        """
+        for name in COUNTED + DIRECTIONS:
+            game.__dict__.pop(name, None)
+        return game
+
+    def _counted(self, name, method):
+        counters = self.counters
+
+        def wrapper(*args, **kwargs):
+            counters[name] += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    def _timed(self, direction, method):
+        histogram = self.histograms[direction]
+        clock = time.perf_counter_ns
+
+        def wrapper():
+            start = clock()
+            moved = method()
+            histogram.record_ns(clock() - start)
+            if self.stream_path and not histogram.count & 0x3FF:
+                self.maybe_flush()
+            return moved
+        return wrapper
+
+    def snapshot(self):
+        """
+        Returns:
+            A JSON-serializable dict of the counters and the per-direction
+            latency histograms.
+        """
+        return {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "counters": dict(self.counters),
+            "latency": {direction: histogram.snapshot()
+                        for direction, histogram in self.histograms.items()},
+        }
+
+    def dump(self, path):
+        """
+        Write the current snapshot to path as JSON.
+        """
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def maybe_flush(self):
+        """
+        Append a snapshot to stream_path if interval seconds passed.
+
+        Returns:
+            True if a snapshot was written.
+        """
+        now = time.monotonic()
+        if not self.stream_path or now - self.last_flush < self.interval:
+            return False
+        self.last_flush = now
+        with open(self.stream_path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+        return True
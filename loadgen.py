@@ -0,0 +1,168 @@
+"""
+Load generator for the game server.
+
+Opens many concurrent sessions against a running server, plays random
+moves in each one and reports the client-side request latency and the
+move throughput.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from .bitboard import DIRECTIONS
+from .metrics import LatencyRecorder
+
+
+class GameClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host=None, port=None, path=None):
+        """
+        Connect over a Unix socket if path is set, TCP otherwise.
+        """
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, **request):
+        """
+        Send one request and wait for its response.
+
+        Returns:
+            The decoded response dict.
+        """
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError('server closed the connection')
+        return json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_session(client, moves, rng, latency):
+    """
+    Play one game of random moves on an open connection.
+
+    Args:
+        client: Connected GameClient
+        moves: Stop after this many moves
+        rng: random.Random choosing the directions
+        latency: LatencyRecorder receiving every request latency
+
+    Returns:
+        The number of moves that changed the board.
+    """
+    clock = time.perf_counter
+
+    async def timed(**request):
+        start = clock()
+        response = await client.request(**request)
+        latency.record(clock() - start)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response
+
+    response = await timed(op="new", seed=rng.getrandbits(32))
+    session = response["session"]
+    moved = 0
+    for _ in range(moves):
+        if response["game_over"]:
+            break
+        response = await timed(op="move", session=session,
+                               direction=rng.choice(DIRECTIONS))
+        moved += response["moved"]
+    await timed(op="close", session=session)
+    return moved
+
+
+async def run_load(sessions=100, moves=200, concurrency=50, host=None,
+                   port=None, path=None, seed=None):
+    """
+    Play sessions games against a server, concurrency at a time, each on
+    its own connection.
+
+    Returns:
+        A dict with the session and move counts, the elapsed seconds,
+        the moves per second and the request latency summary.
+    """
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(32) for _ in range(sessions)]
+    latency = LatencyRecorder()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(session_seed):
+        async with limit:
+            client = await GameClient.connect(host, port, path)
+            try:
+                return await play_session(client, moves,
+                                          random.Random(session_seed),
+                                          latency)
+            finally:
+                await client.close()
+
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(one(session_seed)
+                                    for session_seed in seeds))
+    elapsed = time.perf_counter() - start
+    total = sum(counts)
+    return {
+        "sessions": sessions,
+        "moves": total,
+        "seconds": elapsed,
+        "moves_per_sec": total / elapsed if elapsed else 0.0,
+        "latency": latency.summary(),
+    }
+
+
+async def fetch_metrics(host=None, port=None, path=None):
+    """
+    Returns:
+        The server's metrics dict.
+    """
+    client = await GameClient.connect(host, port, path)
+    try:
+        return await client.request(op="metrics")
+    finally:
+        await client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load test a running 2048 game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2048)
+    parser.add_argument("--unix", default=None,
+                        help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--moves", type=int, default=200,
+                        help="moves per session at most")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run_load(args.sessions, args.moves,
+                                   args.concurrency, args.host, args.port,
+                                   args.unix, args.seed))
+    latency = summary["latency"]
+    print("{sessions} sessions, {moves} moves in {seconds:.2f}s, "
+          "{moves_per_sec:.0f} moves/sec".format(**summary))
+    print("Latency p50 {:.2f}ms, p99 {:.2f}ms, max {:.2f}ms".format(
+        latency["p50"] * 1000, latency["p99"] * 1000,
+        latency["max"] * 1000))
+    print("Server: {}".format(json.dumps(asyncio.run(fetch_metrics(
+        args.host, args.port, args.unix)))))
+
+
+if __name__ == "__main__":
+    main()
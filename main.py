@@ -1,15 +1,156 @@
 import sys
-import copy
-import random
+import argparse
+import importlib
+import os
+from collections import namedtuple
+
+if __name__ == "__main__" and not __package__:
+    # Run as a script (python main.py): import the package this file
+    # lives in, so the relative imports below resolve (PEP 366)
+    _directory = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(_directory))
+    __package__ = os.path.basename(_directory)
+    importlib.import_module(__package__)
+
+from . import bitboard  # noqa: E402
+from .expectimax import ExpectimaxBot, IterativeDeepeningBot  # noqa: E402
+from .history import History  # noqa: E402
+from .parallel import ParallelExpectimaxBot  # noqa: E402
+from .policy_cache import CachedBot, PolicyCache  # noqa: E402
+from .rng import SpawnRandom  # noqa: E402
+from .transposition import TranspositionTable  # noqa: E402
+from .variants import get_shape  # noqa: E402
+
+
+Successor = namedtuple("Successor", ["direction", "board", "changed",
+                                     "score"])
+
+
+class _RowView:
+    """
+    A writable view of one row of a bitboard-backed Game.
+    """
+    __slots__ = ('_game', '_row')
+
+    def __init__(self, game, row):
+        self._game = game
+        self._row = row
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return list(self)[col]
+        cols = self._game.shape.cols
+        if not -cols <= col < cols:
+            raise IndexError('row index out of range')
+        return self._game.shape.get_tile(self._game.board, self._row,
+                                         col % cols)
+
+    def __setitem__(self, col, tile):
+        shape = self._game.shape
+        if not -shape.cols <= col < shape.cols:
+            raise IndexError('row index out of range')
+        self._game.board = shape.set_tile(self._game.board, self._row,
+                                          col % shape.cols, tile)
+
+    def __len__(self):
+        return self._game.shape.cols
+
+    def __iter__(self):
+        cols = self._game.shape.cols
+        board = self._game.board >> (4 * cols * self._row)
+        for col in range(cols):
+            yield bitboard.value((board >> (4 * col)) & bitboard.CELL_MASK)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class _GridView:
+    """
+    A writable rows x cols list-like view of a bitboard-backed Game.
+    """
+    __slots__ = ('_game',)
+
+    def __init__(self, game):
+        self._game = game
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return list(self)[row]
+        rows = self._game.shape.rows
+        if not -rows <= row < rows:
+            raise IndexError('grid index out of range')
+        return _RowView(self._game, row % rows)
+
+    def __len__(self):
+        return self._game.shape.rows
+
+    def __iter__(self):
+        for row in range(self._game.shape.rows):
+            yield _RowView(self._game, row)
+
+    def __eq__(self, other):
+        return [list(row) for row in self] == [list(row) for row in other]
+
+    def __repr__(self):
+        return repr(self._game.shape.decode(self._game.board))
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, four_probability=0.5, rows=4, cols=4,
+                 win_tile=2048):
         """
-        Initiate 4x4 self.grid and 4x4 self.merge_map with all zeros.
+        Initiate an empty packed self.board, rows x cols self.merge_map
+        with all zeros and the game's own spawn random stream.
+
+        Moves and spawns keep self.empty_mask (see bitboard.empty_mask),
+        self.max_rank and self.score up to date as they go, so the game
+        over checks and spawns never rescan the board.
+
+        Args:
+            seed: Seed of the spawn stream, fresh entropy if None
+            four_probability: Chance that a spawned tile is a 4
+            rows: Number of rows of the board
+            cols: Number of columns of the board
+            win_tile: Tile value that wins the game
+        """
+        self.shape = get_shape(rows, cols)
+        self.win_rank = bitboard.rank(win_tile)
+        self.board = 0
+        self.score = 0
+        self.merge_map = [[0] * cols for _ in range(rows)]
+        self.rng = SpawnRandom(seed, four_probability)
+        self.recorder = None
+        self.history = None
+
+    @property
+    def board(self):
+        """
+        The packed board, 64 bits for 4x4. Assigning it recomputes the
+        metadata.
+        """
+        return self._board
+
+    @board.setter
+    def board(self, board):
+        self._board = board
+        self.empty_mask = self.shape.empty_mask(board)
+        self.max_rank = self.shape.max_rank(board)
+
+    @property
+    def grid(self):
         """
-        self.grid = [[0] * 4 for _ in range(4)]
-        self.merge_map = [[0] * 4 for _ in range(4)]
+        A rows x cols list-like view of self.board with tile values.
+        Reads and writes go straight to the bitboard.
+        """
+        return _GridView(self)
+
+    @grid.setter
+    def grid(self, grid):
+        self.board = self.shape.encode(grid)
 
     def initialize(self):
         """
@@ -22,9 +163,10 @@ class Game:
 
     def reset_merge_map(self):
         """
-        A helper function to reset self.merge_map
+        A helper function to reset self.merge_map in place
         """
-        self.merge_map = [[0] * 4 for _ in range(4)]
+        for row in self.merge_map:
+            row[:] = [0] * len(row)
 
     def print_grid(self):
         """
@@ -39,10 +181,16 @@ class Game:
         Start function for human play
         """
         self.initialize()
+        if self.shape.cells <= 16:
+            self.history = History(self.board, self.score, self.shape)
         self.print_grid()
         while True:
-            direction = input("Input your move (up, down, left, right): ")
-            moved = self.move(direction)
+            direction = input("Input your move (up, down, left, right, "
+                              "undo, redo): ")
+            if direction in ("undo", "redo"):
+                moved = getattr(self, direction)()
+            else:
+                moved = self.move(direction)
             if not moved:
                 print("{} is not a valid move!".format(direction))
             self.print_grid()
@@ -58,12 +206,7 @@ class Game:
         Returns:
             A list of tuples of indexes of empty cells
         """
-        empty_cells = []
-        for row in range(4):
-            for column in range(4):
-                if not self.grid[row][column]:
-                    empty_cells.append((row, column))
-        return empty_cells
+        return self.shape.empty_cells(self.board)
 
     def fill_empty_cell(self, empty_cells, n=1):
         """
@@ -75,27 +218,49 @@ class Game:
         while n > 0:
             if empty_cells:
                 n -= 1
-                index = random.randrange(len(empty_cells))
+                index = self.rng.randrange(len(empty_cells))
                 row, column = empty_cells[index]
                 del empty_cells[index]
-                self.grid[row][column] = random.choice([2, 4])
+                self.board = self.shape.set_tile(self.board, row, column,
+                                                 self.rng.tile())
             else:
                 return False
         return True
 
+    def spawn_tile(self):
+        """
+        Fill in one random empty cell with 2 or 4, picked from
+        self.empty_mask. Draws the same random numbers as
+        fill_empty_cell(self.empty_cells()).
+
+        Returns:
+            True if success, False if the board is full
+        """
+        mask = self.empty_mask
+        if not mask:
+            return False
+        for _ in range(self.rng.randrange(mask.bit_count())):
+            mask &= mask - 1
+        bit = mask & -mask
+        tile = bitboard.rank(self.rng.tile())
+        # bit is 1 << (4 * cell), so bit * tile places tile in that cell
+        self._board |= bit * tile
+        self.empty_mask ^= bit
+        if tile > self.max_rank:
+            self.max_rank = tile
+        return True
+
     def is_game_over(self):
         """
         Check if game is over or not.
 
         Returns:
-            True with win msg if 2048 is found.
+            True with win msg if the win tile, 2048 by default, is found.
             True with lose msg if no possible moves.
             False with no msg if game if possible moves exist.
         """
-        for row in range(4):
-            for column in range(4):
-                if self.grid[row][column] == 2048:
-                    return True, "Game finishes, you win!"
+        if self.max_rank >= self.win_rank:
+            return True, "Game finishes, you win!"
 
         possible_move = self.valid_move_exists()
         if possible_move:
@@ -105,28 +270,27 @@ class Game:
 
     def valid_move_exists(self):
         """
-        Copy the grid into a deep copy and check if valid moves exist.
+        Check self.empty_mask, then scan the bitboard for equal
+        neighbours to check if valid moves exist.
 
         Returns:
             True if valid moves exist, False otherwise.
         """
-        grid_copy = copy.deepcopy(self.grid)
-        copy_game = Game()
-        copy_game.grid = grid_copy
+        return bool(self.empty_mask) or self.shape.can_move(self._board)
 
-        moved = copy_game.up()
-        if moved:
-            return True
-        moved = copy_game.down()
-        if moved:
-            return True
-        moved = copy_game.left()
-        if moved:
-            return True
-        moved = copy_game.right()
-        if moved:
-            return True
-        return False
+    def successors(self):
+        """
+        Compute the result of all four moves in one pass without
+        changing self.board.
+
+        Returns:
+            A list of Successor(direction, board, changed, score) in
+            up, down, left, right order.
+        """
+        board = self.board
+        return [Successor(direction, moved, moved != board, score)
+                for direction, (moved, score)
+                in zip(bitboard.DIRECTIONS, self.shape.successors(board))]
 
     def can_move(self, row_1, col_1, row_2, col_2):
         """
@@ -186,87 +350,52 @@ class Game:
 
     def up(self):
         """
-        Move all cells in row[1], row[2], row[3] upwards.
-        Reset self.merge_map before return
+        Move all cells in row[1], row[2], row[3] upwards on the bitboard.
 
         Returns:
             True if move happened, False otherwise.
         """
-        moved = False
-        for row in range(1, 4):
-            for col in range(4):
-                current_row = row
-                while (current_row > 0 and
-                       self.can_move(current_row, col,
-                                     current_row-1, col)):
-                    moved = self.move_cell(current_row, col,
-                                           current_row-1, col)
-                    current_row -= 1
-        self.reset_merge_map()
-        return moved
+        return self._slide("up")
 
     def down(self):
         """
-        Move all cells in row[0], row[1], row[2] downwards.
-        Reset self.merge_map before return
+        Move all cells in row[0], row[1], row[2] downwards on the bitboard.
 
         Returns:
             True if move happened, False otherwise.
         """
-        moved = False
-        for row in reversed(range(0, 3)):
-            for col in range(4):
-                current_row = row
-                while (current_row < 3 and
-                       self.can_move(current_row, col,
-                                     current_row+1, col)):
-                    moved = self.move_cell(current_row, col,
-                                           current_row+1, col)
-                    current_row += 1
-        self.reset_merge_map()
-        return moved
+        return self._slide("down")
 
     def left(self):
         """
-        Move all cells in col[1], col[2], col[3] leftwards.
-        Reset self.merge_map before return
+        Move all cells in col[1], col[2], col[3] leftwards on the bitboard.
 
         Returns:
             True if move happened, False otherwise.
         """
-        moved = False
-        for col in range(1, 4):
-            for row in range(4):
-                current_col = col
-                while (current_col > 0 and
-                       self.can_move(row, current_col,
-                                     row, current_col-1)):
-                    moved = self.move_cell(row, current_col,
-                                           row, current_col-1)
-                    current_col -= 1
-        self.reset_merge_map()
-        return moved
+        return self._slide("left")
 
     def right(self):
         """
-        Move all cells in col[0], col[1], col[2] rightwards.
-        Reset self.merge_map before return
+        Move all cells in col[0], col[1], col[2] rightwards on the bitboard.
 
         Returns:
             True if move happened, False otherwise.
         """
-        moved = False
-        for col in reversed(range(0, 3)):
-            for row in range(4):
-                current_col = col
-                while (current_col < 3 and
-                       self.can_move(row, current_col,
-                                     row, current_col+1)):
-                    moved = self.move_cell(row, current_col,
-                                           row, current_col+1)
-                    current_col += 1
-        self.reset_merge_map()
-        return moved
+        return self._slide("right")
+
+    def _slide(self, direction):
+        # Apply a bitboard move and update the metadata. Only merges can
+        # raise the max tile, so it is recomputed only when they score.
+        board, score = self.shape.execute_move(self._board, direction)
+        if board == self._board:
+            return False
+        self._board = board
+        self.empty_mask = self.shape.empty_mask(board)
+        if score:
+            self.score += score
+            self.max_rank = self.shape.max_rank(board)
+        return True
 
     def move(self, direction):
         """
@@ -291,12 +420,43 @@ class Game:
         elif direction == "right":
             moved = self.right()
         if moved:
-            empty_cells = self.empty_cells()
-            success = self.fill_empty_cell(empty_cells)
+            moved_board = self._board
+            success = self.spawn_tile()
             if not success:
                 raise Exception('Fill empty cell does not work normally!')
+            if self.recorder is not None:
+                self.recorder.record_move(direction, moved_board, self.board)
+            if self.history is not None:
+                self.history.record(direction, moved_board, self._board,
+                                    self.score)
         return moved
 
+    def undo(self):
+        """
+        Restore the position before the last move recorded in
+        self.history.
+
+        Returns:
+            True if a move was undone, False otherwise.
+        """
+        return self._restore(self.history.undo() if self.history else None)
+
+    def redo(self):
+        """
+        Replay the last undone move, spawn included.
+
+        Returns:
+            True if a move was redone, False otherwise.
+        """
+        return self._restore(self.history.redo() if self.history else None)
+
+    def _restore(self, position):
+        if position is None:
+            return False
+        board, self.score = position
+        self.board = int(board)
+        return True
+
     def bot_start(self):
         """
         Start function for my AI algorithm
@@ -346,11 +506,88 @@ class Game:
                 print(msg)
                 sys.exit(0)
 
+    def search_start(self, bot):
+        """
+        Start function for a search bot such as ExpectimaxBot
+
+        Args:
+            bot: Object whose best_move(board) returns a direction
+        """
+        self.initialize()
+        self.print_grid()
+        step_count = 0
+        while True:
+            direction = bot.best_move(self.board)
+            if direction is not None and self.move(direction):
+                step_count += 1
+                print("Step {}, {}".format(step_count, direction))
+            self.print_grid()
+            game_over, msg = self.is_game_over()
+            if game_over:
+                print(msg)
+                print("{:.0f} nodes/sec".format(bot.nodes_per_second()))
+                print("Move latency: {}".format(
+                    bot.latency.format_summary()))
+                sys.exit(0)
+
 
-def main():
-    game = Game()
-    game.bot_start()
-    # game.start() for human
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play 2048.")
+    parser.add_argument("--player", default="bot",
+                        choices=["bot", "expectimax", "human"])
+    parser.add_argument("--depth", type=int, default=2,
+                        help="search depth of the expectimax player")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed of the tile spawns")
+    parser.add_argument("--time-limit", type=float, default=0,
+                        help="per-move budget in ms; deepens the search "
+                             "iteratively up to --depth instead of a "
+                             "fixed depth")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="search the root across this many processes")
+    parser.add_argument("--table-mb", type=int, default=0,
+                        help="transposition table size in MB, 0 for none")
+    parser.add_argument("--policy-cache", default=None,
+                        help="file of cached best moves, created if "
+                             "missing and reused across runs")
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--cols", type=int, default=4)
+    parser.add_argument("--win-tile", type=int, default=2048)
+    args = parser.parse_args(argv)
+    if args.player == "expectimax" and (args.rows, args.cols) != (4, 4):
+        parser.error("the expectimax player only plays 4x4 boards")
+
+    game = Game(seed=args.seed, rows=args.rows, cols=args.cols,
+                win_tile=args.win_tile)
+    if args.player == "human":
+        game.start()
+    elif args.player == "expectimax":
+        table = None
+        if args.table_mb:
+            table = TranspositionTable(max_bytes=args.table_mb << 20)
+        if args.workers:
+            bot = ParallelExpectimaxBot(depth=args.depth,
+                                        workers=args.workers,
+                                        table_bytes=args.table_mb << 20)
+        elif args.time_limit:
+            bot = IterativeDeepeningBot(time_limit=args.time_limit / 1000,
+                                        max_depth=args.depth, table=table)
+        else:
+            bot = ExpectimaxBot(depth=args.depth, table=table)
+        cache = None
+        if args.policy_cache:
+            cache = PolicyCache(args.policy_cache)
+            cache.warm()
+            bot = CachedBot(bot, cache)
+        try:
+            game.search_start(bot)
+        finally:
+            if args.workers:
+                bot.close()
+            if cache is not None:
+                cache.close()
+    else:
+        game.bot_start()
 
 
 if __name__ == "__main__":
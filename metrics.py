@@ -0,0 +1,133 @@
+"""
+Latency bookkeeping shared by bots, runners and servers.
+"""
+import math
+from array import array
+
+
+class LatencyRecorder:
+    def __init__(self, max_samples=100000):
+        """
+        Initiate an empty recorder keeping the most recent samples.
+
+        Args:
+            max_samples: Number of samples kept for the percentiles
+        """
+        self.max_samples = max_samples
+        self.samples = array('d')
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        """
+        Add one latency sample, in seconds.
+        """
+        if len(self.samples) < self.max_samples:
+            self.samples.append(seconds)
+        else:
+            # Overwrite the oldest sample once the buffer is full
+            self.samples[self.count % self.max_samples] = seconds
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, p):
+        """
+        Nearest-rank percentile of the kept samples.
+
+        Args:
+            p: Percentile between 0 and 100
+
+        Returns:
+            The latency in seconds, 0 if nothing was recorded.
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+        return ordered[index]
+
+    def summary(self):
+        """
+        Returns:
+            A dict with the sample count, mean, p50/p90/p99 and max latency
+            in seconds.
+        """
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "mean": mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.maximum,
+        }
+
+    def format_summary(self):
+        """
+        Returns:
+            A one-line human readable summary in milliseconds.
+        """
+        summary = self.summary()
+        return ("{count} samples, mean {mean:.2f}ms, p50 {p50:.2f}ms, "
+                "p90 {p90:.2f}ms, p99 {p99:.2f}ms, max {max:.2f}ms").format(
+            count=summary["count"],
+            **{key: summary[key] * 1000
+               for key in ("mean", "p50", "p90", "p99", "max")})
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=32):
+        """
+        Initiate a histogram with power-of-two nanosecond buckets.
+        Bucket i counts samples in [2 ** (i - 1), 2 ** i) ns.
+
+        Args:
+            buckets: Number of buckets, the last one is open-ended
+        """
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total_ns = 0
+
+    def record_ns(self, nanoseconds):
+        """
+        Add one latency sample, in nanoseconds.
+        """
+        bucket = min(nanoseconds.bit_length(), len(self.counts) - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_ns += nanoseconds
+
+    def percentile_ns(self, p):
+        """
+        Upper bound of the bucket holding the p-th percentile.
+
+        Returns:
+            The latency bound in nanoseconds, 0 if nothing was recorded.
+        """
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return 1 << bucket
+        return 1 << (len(self.counts) - 1)
+
+    def snapshot(self):
+        """
+        Returns:
+            A dict with the count, mean, p50/p99 bounds in ns and the
+            non-empty buckets keyed by their upper bound.
+        """
+        return {
+            "count": self.count,
+            "mean_ns": self.total_ns / self.count if self.count else 0.0,
+            "p50_ns": self.percentile_ns(50),
+            "p99_ns": self.percentile_ns(99),
+            "buckets": {1 << bucket: count
+                        for bucket, count in enumerate(self.counts)
+                        if count},
+        }
@@ -0,0 +1,207 @@
+"""
+N-tuple network player trained by temporal-difference learning.
+
+The value of a board is a sum of weights looked up by the tiles under a
+few fixed cell patterns, applied to all eight symmetries of the board.
+The weight indexes of all those features are read at once: one table per
+byte of the board (two cells) holds the share of that byte in every
+index, packed side by side into one int, so the eight lookups are summed
+and split back into an array of indexes.
+All weights live in one flat float32 array, so a trained network can be
+saved once and memory-mapped read-only by any number of worker
+processes, which then share the same pages.
+"""
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from . import bitboard
+from .main import Game
+from .transposition import symmetries
+
+# Cell indexes 4 * row + col: two rows and three 2x2 squares
+DEFAULT_PATTERNS = ((0, 1, 2, 3), (4, 5, 6, 7),
+                    (0, 1, 4, 5), (1, 2, 5, 6), (5, 6, 9, 10))
+MAGIC = b'2048NTUP'
+_HEADER_ALIGN = 64
+
+
+class NTupleNetwork:
+    def __init__(self, patterns=DEFAULT_PATTERNS, weights=None):
+        """
+        Args:
+            patterns: Tuples of cell indexes, 4 * row + col
+            weights: Flat float32 buffer, zeros if None
+        """
+        self.patterns = tuple(tuple(pattern) for pattern in patterns)
+        self.offsets = []
+        size = 0
+        for pattern in self.patterns:
+            self.offsets.append(size)
+            size += 16 ** len(pattern)
+        self.size = size
+        if weights is None:
+            weights = array('f', bytes(4 * size))
+        if len(weights) != size:
+            raise ValueError('expected {} weights, got {}'.format(
+                size, len(weights)))
+        self.weights = weights
+        self.features = 8 * len(self.patterns)
+        self._build_tables()
+
+    def _build_tables(self):
+        # Feature k of the packed int sits at bits [k * width, (k + 1) *
+        # width), in symmetries order and patterns order within each
+        self._typecode = 'I' if self.size <= 1 << 32 else 'Q'
+        width = 8 * array(self._typecode).itemsize
+        self._bytes = self.features * width // 8
+        # sources[s][cell] is the board cell read as cell of symmetry s
+        sources = [[0] * 16 for _ in range(8)]
+        for cell in range(16):
+            for source, symmetric in zip(sources, symmetries(1 << 4 * cell)):
+                source[(symmetric.bit_length() - 1) // 4] = cell
+        self._base = 0
+        self._tables = tables = [[0] * 256 for _ in range(8)]
+        feature = 0
+        for source in sources:
+            for pattern, offset in zip(self.patterns, self.offsets):
+                shift = feature * width
+                self._base |= offset << shift
+                for position, cell in enumerate(pattern):
+                    table = tables[source[cell] >> 1]
+                    low = 4 * (source[cell] & 1)
+                    for chunk in range(256):
+                        table[chunk] += ((chunk >> low) & 0xF) \
+                            << (shift + 4 * position)
+                feature += 1
+
+    def indices(self, board):
+        """
+        Returns:
+            An array of the flat weight indexes of every pattern on every
+            symmetry of the board.
+        """
+        chunks = board.to_bytes(8, 'little')
+        t = self._tables
+        packed = (self._base + t[0][chunks[0]] + t[1][chunks[1]] +
+                  t[2][chunks[2]] + t[3][chunks[3]] + t[4][chunks[4]] +
+                  t[5][chunks[5]] + t[6][chunks[6]] + t[7][chunks[7]])
+        return array(self._typecode,
+                     packed.to_bytes(self._bytes, sys.byteorder))
+
+    def value(self, board):
+        """
+        Returns:
+            The estimated value of a board, usually an afterstate.
+        """
+        return sum(map(self.weights.__getitem__, self.indices(board)))
+
+    def update(self, board, delta):
+        """
+        Spread delta over the weights of every feature of the board.
+        """
+        weights = self.weights
+        step = delta / self.features
+        for index in self.indices(board):
+            weights[index] += step
+
+    def evaluate_moves(self, board):
+        """
+        Returns:
+            A list of (value, direction, afterstate, reward) for every
+            move that changes the board.
+        """
+        moves = []
+        for direction, (moved, reward) in zip(bitboard.DIRECTIONS,
+                                              bitboard.successors(board)):
+            if moved != board:
+                moves.append((reward + self.value(moved), direction,
+                              moved, reward))
+        return moves
+
+    def best_move(self, board):
+        """
+        Pick the move with the best reward plus afterstate value.
+
+        Returns:
+            One of up, down, left, right, or None if no move is possible.
+        """
+        moves = self.evaluate_moves(board)
+        return max(moves)[1] if moves else None
+
+    def save(self, path):
+        """
+        Write the patterns and weights to path.
+        """
+        header = json.dumps({"patterns": self.patterns}).encode()
+        length = len(MAGIC) + 4 + len(header)
+        padding = -length % _HEADER_ALIGN
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header) + padding))
+            f.write(header + b' ' * padding)
+            array('f', self.weights).tofile(f)
+
+    @classmethod
+    def load(cls, path, shared=True):
+        """
+        Load a saved network.
+
+        Args:
+            path: File written by save
+            shared: Memory-map the weights read-only instead of copying
+                them, so processes loading the same file share one copy
+
+        Returns:
+            An NTupleNetwork.
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('{} is not an n-tuple network!'.format(
+                    path))
+            header_size, = struct.unpack('<I', f.read(4))
+            patterns = json.loads(f.read(header_size))["patterns"]
+            start = len(MAGIC) + 4 + header_size
+            if shared:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                weights = memoryview(buffer)[start:].cast('f')
+            else:
+                weights = array('f')
+                weights.frombytes(f.read())
+        return cls(patterns, weights)
+
+
+def train(network, episodes, alpha=0.1, seed=None):
+    """
+    Train a network by TD(0) on afterstates through self-play.
+
+    Args:
+        network: NTupleNetwork with writable weights
+        episodes: Number of games played
+        alpha: Learning rate, spread across the features of a board
+        seed: Base seed of the games, game i uses seed + i
+
+    Returns:
+        The list of final scores, one per game.
+    """
+    scores = []
+    for episode in range(episodes):
+        game = Game(seed=None if seed is None else seed + episode)
+        game.initialize()
+        score = 0
+        moves = network.evaluate_moves(game.board)
+        while moves:
+            _, direction, afterstate, reward = max(moves)
+            game.move(direction)
+            score += reward
+            moves = network.evaluate_moves(game.board)
+            if moves:
+                target, _, _, _ = max(moves)
+            else:
+                target = 0.0
+            network.update(afterstate,
+                           alpha * (target - network.value(afterstate)))
+        scores.append(score)
+    return scores
@@ -0,0 +1,149 @@
+"""
+Root-parallel expectimax over a process pool.
+
+The root of the search is split into independent subtrees, either one
+per legal move or one per spawn outcome after each legal move, and the
+subtrees are searched by persistent worker processes. Workers build (or
+load) the row tables once at start-up and receive boards as packed ints.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard
+from .expectimax import ExpectimaxBot, default_evaluate
+from .tables import get_tables
+from .transposition import TranspositionTable
+
+_worker_bot = None
+
+
+def _init_worker(evaluate, min_probability, four_probability, table_bytes,
+                 cache_path):
+    global _worker_bot
+    get_tables(cache_path)
+    table = TranspositionTable(table_bytes) if table_bytes else None
+    # Also builds the default evaluator, so the first task starts warm
+    _worker_bot = ExpectimaxBot(evaluate=evaluate, table=table,
+                                min_probability=min_probability,
+                                four_probability=four_probability)
+
+
+def _ping(_):
+    return _worker_bot is not None
+
+
+def _search_max(board, depth, probability):
+    nodes = _worker_bot.nodes
+    value = _worker_bot.max_value(board, depth, probability)
+    return value, _worker_bot.nodes - nodes
+
+
+def _search_chance(board, depth):
+    nodes = _worker_bot.nodes
+    value = _worker_bot.chance_value(board, depth)
+    return value, _worker_bot.nodes - nodes
+
+
+class ParallelExpectimaxBot(ExpectimaxBot):
+    def __init__(self, depth=3, workers=None, split="spawns",
+                 evaluate=default_evaluate, min_probability=0.0,
+                 table_bytes=0, cache_path=None, four_probability=0.5):
+        """
+        Start the worker pool and wait until every worker is warm.
+
+        Args:
+            depth: Number of player moves searched ahead
+            workers: Number of worker processes, os.cpu_count() if None
+            split: "moves" for one task per root move, "spawns" for one
+                task per spawn outcome after each root move
+            evaluate: Picklable function scoring a packed leaf board
+            min_probability: Chance nodes reached with a lower cumulative
+                probability are evaluated instead of searched
+            table_bytes: Per-worker transposition table size, 0 for none
+            cache_path: Row table cache file shared by the workers
+            four_probability: Chance that a spawned tile is a 4
+        """
+        if split not in ("moves", "spawns"):
+            raise ValueError('{} is not a valid split!'.format(split))
+        super().__init__(depth=depth, evaluate=evaluate,
+                         min_probability=min_probability,
+                         four_probability=four_probability)
+        self.split = split
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(evaluate, min_probability, four_probability,
+                      table_bytes, cache_path))
+        list(self.executor.map(_ping, range(self.workers)))
+
+    def close(self):
+        """
+        Shut the worker pool down.
+        """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search_root(self, board, depth):
+        """
+        Returns:
+            The direction with the best expected value searched depth
+            deep, or None if no move is possible.
+        """
+        roots = []
+        for direction in bitboard.DIRECTIONS:
+            moved, score = bitboard.execute_move(board, direction)
+            if moved != board:
+                roots.append((direction, moved, score))
+        if depth <= 1 or not roots:
+            return super().search_root(board, depth)
+
+        if self.split == "moves":
+            futures = [self.executor.submit(_search_chance, moved, depth - 1)
+                       for _, moved, _ in roots]
+            values = []
+            for future in futures:
+                value, nodes = future.result()
+                self.nodes += nodes
+                values.append(value)
+        else:
+            values = self._search_spawns(roots, depth)
+
+        best_direction = None
+        best_value = float('-inf')
+        for (direction, _, score), value in zip(roots, values):
+            value += score
+            if value > best_value:
+                best_direction, best_value = direction, value
+        return best_direction
+
+    def _search_spawns(self, roots, depth):
+        # One task per (root move, empty cell, spawned tile), reduced in
+        # the same order as ExpectimaxBot.chance_value
+        tasks = []
+        for _, moved, _ in roots:
+            cells = bitboard.empty_cells(moved)
+            cell_probability = 1.0 / len(cells)
+            futures = []
+            for row, col in cells:
+                shift = 4 * (4 * row + col)
+                for nibble, probability in self.spawns:
+                    futures.append((probability, self.executor.submit(
+                        _search_max, moved | nibble << shift, depth - 1,
+                        cell_probability * probability)))
+            tasks.append((len(cells), futures))
+        self.nodes += len(roots)
+
+        values = []
+        for cell_count, futures in tasks:
+            total = 0.0
+            for probability, future in futures:
+                value, nodes = future.result()
+                self.nodes += nodes
+                total += probability * value
+            values.append(total / cell_count)
+        return values
@@ -0,0 +1,239 @@
+"""
+Persistent on-disk cache of the best move of frequently seen boards.
+
+The cache is a fixed-size file used through mmap. Boards are keyed on
+their canonical form under the eight symmetries, with the best move
+stored for the canonical board, so all symmetric positions share one
+entry. Slots are grouped in buckets of WAYS; a new board takes a free
+slot of its bucket or evicts the least recently used one, so the file
+never grows past the size chosen when it was created.
+
+One process may open the cache writable while any number of workers open
+it read-only and share its pages. Opening a file that already exists
+picks up everything previous runs stored in it.
+"""
+import mmap
+import os
+import struct
+
+from .bitboard import DIRECTIONS, execute_move
+from .transposition import INVERSE_MOVES, SYMMETRY_MOVES, canonical_symmetry
+
+MAGIC = b'2048PCH2'
+# slot count, use clock
+_HEADER = struct.Struct('<QQ')
+_HEADER_SIZE = 64
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_FINGERPRINT_MULTIPLIER = 0xC2B2AE3D27D4EB4F
+_WORD = (1 << 64) - 1
+WAYS = 8
+MAX_DEPTH = 63
+_DIRECTION_INDEX = {direction: index
+                    for index, direction in enumerate(DIRECTIONS)}
+
+
+class PolicyCache:
+    def __init__(self, path, max_entries=1 << 20, readonly=False):
+        """
+        Open a cache file, creating it if needed.
+
+        Args:
+            path: Cache file
+            max_entries: Capacity of a new file, rounded up to a power of
+                two; an existing file keeps its own capacity
+            readonly: Map the file read-only, so it can be shared by
+                worker processes; put is then a no-op
+        """
+        self.path = path
+        self.readonly = readonly
+        if not readonly and not os.path.exists(path):
+            _create(path, max_entries)
+        with open(path, 'rb' if readonly else 'r+b') as f:
+            access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+            self._mmap = mmap.mmap(f.fileno(), 0, access=access)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError('{} is not a policy cache!'.format(path))
+        slots, self.clock = _HEADER.unpack_from(self._mmap, len(MAGIC))
+        self.slots = slots
+        self._bits = slots.bit_length() - 1
+        self._view = view = memoryview(self._mmap)
+        self._keys = view[_HEADER_SIZE:_HEADER_SIZE + 8 * slots].cast('Q')
+        # Last use clock << 24 | key fingerprint << 8 | depth << 2 |
+        # index into DIRECTIONS. A reader racing the writer may pair a
+        # key with the entry of another board; the fingerprint turns
+        # that into a miss.
+        self._entries = view[_HEADER_SIZE + 8 * slots:
+                             _HEADER_SIZE + 16 * slots].cast('Q')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _bucket(self, key):
+        slot = ((key * _HASH_MULTIPLIER) & _WORD) >> (64 - self._bits)
+        start = slot & ~(WAYS - 1)
+        return range(start, start + WAYS)
+
+    def get(self, board, depth=0):
+        """
+        Look up the best move of a board searched at least depth deep.
+
+        Returns:
+            The direction, or None on a miss.
+        """
+        key, symmetry = canonical_symmetry(board)
+        fingerprint = _fingerprint(key)
+        keys = self._keys
+        for slot in self._bucket(key):
+            if keys[slot] == key:
+                entry = self._entries[slot]
+                if (entry >> 8) & 0xFFFF != fingerprint or \
+                        (entry >> 2) & MAX_DEPTH < depth:
+                    break
+                if not self.readonly:
+                    self.clock += 1
+                    self._entries[slot] = self.clock << 24 | entry & 0xFFFFFF
+                self.hits += 1
+                return INVERSE_MOVES[symmetry][DIRECTIONS[entry & 3]]
+            if not keys[slot]:
+                break
+        self.misses += 1
+        return None
+
+    def put(self, board, direction, depth):
+        """
+        Store the best move of a board searched depth deep.
+        A shallower result never replaces a deeper one.
+        """
+        key, symmetry = canonical_symmetry(board)
+        if self.readonly or not key:
+            # Key 0 marks a free slot, the empty board is never cached
+            return
+        self.clock += 1
+        entry = (self.clock << 24 | _fingerprint(key) << 8 |
+                 min(depth, MAX_DEPTH) << 2 |
+                 _DIRECTION_INDEX[SYMMETRY_MOVES[symmetry][direction]])
+        keys = self._keys
+        entries = self._entries
+        victim = None
+        for slot in self._bucket(key):
+            if keys[slot] == key:
+                if (entries[slot] >> 2) & MAX_DEPTH > depth:
+                    entry = self.clock << 24 | entries[slot] & 0xFFFFFF
+                entries[slot] = entry
+                return
+            if not keys[slot]:
+                victim = slot
+                break
+            if victim is None or entries[slot] >> 24 < entries[victim] >> 24:
+                victim = slot
+        if keys[victim]:
+            self.evictions += 1
+        # Entry first: a reader still matching the old key then sees a
+        # fingerprint of the new one and misses
+        entries[victim] = entry
+        keys[victim] = key
+
+    def __len__(self):
+        return sum(1 for key in self._keys if key)
+
+    def warm(self):
+        """
+        Touch every page of the file once, so later lookups do not wait
+        on disk.
+
+        Returns:
+            The number of pages touched.
+        """
+        return len(self._mmap[::mmap.PAGESIZE])
+
+    def stats(self):
+        """
+        Returns:
+            A dict of the hit/miss/eviction counters and the capacity.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "slots": self.slots,
+        }
+
+    def flush(self):
+        """
+        Write the use clock and every change back to the file.
+        """
+        if not self.readonly:
+            _HEADER.pack_into(self._mmap, len(MAGIC), self.slots, self.clock)
+            self._mmap.flush()
+
+    def close(self):
+        self.flush()
+        self._keys.release()
+        self._entries.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _fingerprint(key):
+    # 16 hash bits independent of the ones picking the bucket
+    return ((key * _FINGERPRINT_MULTIPLIER) & _WORD) >> 48
+
+
+def _create(path, max_entries):
+    slots = WAYS
+    while slots < max_entries:
+        slots <<= 1
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write((MAGIC + _HEADER.pack(slots, 0)).ljust(_HEADER_SIZE, b'\0'))
+        f.truncate(_HEADER_SIZE + 16 * slots)
+    os.replace(tmp_path, path)
+
+
+class CachedBot:
+    """
+    Wrap any bot with a best_move(board) method so that it consults a
+    PolicyCache first and stores the moves it computes. A cached move
+    that would not change the board is ignored and the bot asked instead.
+    Other attributes are those of the wrapped bot.
+    """
+
+    def __init__(self, bot, cache, min_depth=None):
+        """
+        Args:
+            bot: Object whose best_move(board) returns a direction
+            cache: PolicyCache
+            min_depth: Shallowest cached search accepted. If None, the
+                depth of the bot's own searches: the depth reached by
+                its last search for a bot reporting last_depth, such as
+                IterativeDeepeningBot, bot.depth (or 0) otherwise
+        """
+        self.bot = bot
+        self.cache = cache
+        self.min_depth = min_depth
+
+    def _searched_depth(self):
+        return getattr(self.bot, "last_depth", getattr(self.bot, "depth", 0))
+
+    def best_move(self, board):
+        min_depth = self.min_depth
+        if min_depth is None:
+            min_depth = self._searched_depth()
+        direction = self.cache.get(board, min_depth)
+        if direction is not None and \
+                execute_move(board, direction)[0] != board:
+            return direction
+        direction = self.bot.best_move(board)
+        if direction is not None:
+            self.cache.put(board, direction, self._searched_depth())
+        return direction
+
+    def __getattr__(self, name):
+        return getattr(self.bot, name)
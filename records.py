@@ -0,0 +1,279 @@
+"""
+Compact binary game records.
+
+A record file starts with an 8-byte magic and holds one record per game:
+
+    u32  size of the rest of the record in bytes
+    u64  initial packed board, after Game.initialize
+    u32  number of moves n
+    u8   rows, u8 cols and u8 log2 of the win tile
+    ceil(n / 4) bytes of moves, 2 bits each, index into DIRECTIONS
+    n bytes of spawns, cell index in bits 0-3 and 1 in bit 4 for a 4
+
+Boards of up to 16 cells can be recorded, replays go through the
+variants.Shape of the recorded size.
+
+Records are appended by a RecordWriter and read back through mmap by a
+RecordReader, which replays boards on demand. A truncated record at the
+end of the file, left by a writer that died while appending, is ignored
+by readers and cut off by the next writer.
+"""
+import mmap
+import os
+import struct
+from array import array
+
+from . import bitboard
+from .main import Game
+from .variants import get_shape
+
+MAGIC = b'2048REC2'
+_HEADER = struct.Struct('<IQIBBB')
+_DIRECTION_INDEX = {direction: index
+                    for index, direction in enumerate(bitboard.DIRECTIONS)}
+
+
+class GameRecorder:
+    def __init__(self, writer, board, shape, win_rank):
+        """
+        Collect the moves of one game started from board.
+        """
+        self.writer = writer
+        self.initial_board = board
+        self.shape = shape
+        self.win_rank = win_rank
+        self.moves = bytearray()
+        self.spawns = bytearray()
+
+    def record_move(self, direction, moved_board, board):
+        """
+        Record one move and the tile spawned after it.
+
+        Args:
+            direction: Direction of the move
+            moved_board: Board after the move, before the spawn
+            board: Board after the spawn
+        """
+        count = len(self.spawns)
+        if not count & 3:
+            self.moves.append(0)
+        self.moves[-1] |= _DIRECTION_INDEX[direction] << (2 * (count & 3))
+        cell = ((board ^ moved_board).bit_length() - 1) // 4
+        nibble = (board >> (4 * cell)) & bitboard.CELL_MASK
+        self.spawns.append(cell | (nibble - 1) << 4)
+
+    def finish(self):
+        """
+        Append the game to the record file.
+        """
+        self.writer.write(self.initial_board, len(self.spawns),
+                          bytes(self.moves), bytes(self.spawns),
+                          self.shape.rows, self.shape.cols, self.win_rank)
+
+
+class RecordWriter:
+    def __init__(self, path):
+        """
+        Open a record file for appending, writing the magic if it is new
+        and dropping a truncated last record.
+        """
+        self.file = open(path, 'ab')
+        size = self.file.tell()
+        if size == 0:
+            self.file.write(MAGIC)
+        else:
+            try:
+                with RecordReader(path) as reader:
+                    end = reader.end()
+            except ValueError:
+                self.file.close()
+                raise
+            if end < size:
+                self.file.truncate(end)
+        self.games = 0
+
+    def start_game(self, board, shape=None, win_tile=2048):
+        """
+        Args:
+            board: Packed board after Game.initialize
+            shape: variants.Shape of the game (Game.shape), 4x4 if None;
+                at most 16 cells
+            win_tile: Tile value that wins the game
+
+        Returns:
+            A GameRecorder for a game starting from board. Assign it to
+            Game.recorder to record every Game.move.
+        """
+        shape = shape or get_shape()
+        if shape.cells > 16:
+            raise ValueError('records support boards of at most 16 cells')
+        return GameRecorder(self, board, shape, bitboard.rank(win_tile))
+
+    def write(self, initial_board, move_count, moves, spawns, rows=4,
+              cols=4, win_rank=11):
+        """
+        Append one encoded game.
+        """
+        self.file.write(_HEADER.pack(
+            _HEADER.size - 4 + len(moves) + len(spawns), initial_board,
+            move_count, rows, cols, win_rank))
+        self.file.write(moves)
+        self.file.write(spawns)
+        self.games += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameRecord:
+    def __init__(self, buffer, offset):
+        """
+        A lazily decoded record at offset of a record buffer.
+        """
+        _, self.initial_board, self.move_count, rows, cols, \
+            self.win_rank = _HEADER.unpack_from(buffer, offset)
+        self.shape = get_shape(rows, cols)
+        self._buffer = buffer
+        self._moves = offset + _HEADER.size
+        self._spawns = self._moves + (self.move_count + 3) // 4
+
+    def __len__(self):
+        return self.move_count
+
+    def moves(self):
+        """
+        Returns:
+            The list of directions of the game.
+        """
+        packed = self._buffer[self._moves:self._spawns]
+        return [bitboard.DIRECTIONS[(packed[step >> 2] >> (2 * (step & 3)))
+                                    & 3]
+                for step in range(self.move_count)]
+
+    def spawns(self):
+        """
+        Returns:
+            A list of (row, col, tile) spawned after each move.
+        """
+        packed = self._buffer[self._spawns:self._spawns + self.move_count]
+        cols = self.shape.cols
+        return [divmod(spawn & 0xF, cols) + (2 << (spawn >> 4),)
+                for spawn in packed]
+
+    def boards(self):
+        """
+        Replay the game.
+
+        Yields:
+            The packed board before the first move and after every move.
+        """
+        board = self.initial_board
+        yield board
+        spawns = self._buffer[self._spawns:self._spawns + self.move_count]
+        execute_move = self.shape.execute_move
+        for direction, spawn in zip(self.moves(), spawns):
+            board = execute_move(board, direction)[0]
+            board |= ((spawn >> 4) + 1) << (4 * (spawn & 0xF))
+            yield board
+
+    def game_at(self, step):
+        """
+        Rebuild the Game as it was after step moves, score included.
+        """
+        if not 0 <= step <= self.move_count:
+            raise IndexError('record has only {} moves'.format(
+                self.move_count))
+        board = self.initial_board
+        score = 0
+        spawns = self._buffer[self._spawns:self._spawns + step]
+        execute_move = self.shape.execute_move
+        for direction, spawn in zip(self.moves(), spawns):
+            board, gained = execute_move(board, direction)
+            score += gained
+            board |= ((spawn >> 4) + 1) << (4 * (spawn & 0xF))
+        game = Game(rows=self.shape.rows, cols=self.shape.cols,
+                    win_tile=bitboard.value(self.win_rank))
+        game.board = board
+        game.score = score
+        return game
+
+
+class RecordReader:
+    def __init__(self, path):
+        """
+        Map a record file into memory without reading it.
+        """
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            # mmap cannot map an empty file, treat it as holding no games
+            self.buffer = MAGIC
+        else:
+            self.buffer = mmap.mmap(self.file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not a game record file!'.format(path))
+        self._offsets = None
+
+    def _scan(self):
+        # Stop at a truncated last record, as left by a writer that died
+        # while appending, instead of failing on the whole file
+        buffer = self.buffer
+        offset = len(MAGIC)
+        end = len(buffer)
+        while offset + _HEADER.size <= end:
+            next_offset = offset + 4 + _HEADER.unpack_from(buffer, offset)[0]
+            if next_offset > end:
+                break
+            yield offset
+            offset = next_offset
+
+    def end(self):
+        """
+        Returns:
+            The byte offset just past the last complete record.
+        """
+        offsets = self.offsets()
+        if not offsets:
+            return len(MAGIC)
+        return offsets[-1] + 4 + _HEADER.unpack_from(self.buffer,
+                                                     offsets[-1])[0]
+
+    def __iter__(self):
+        for offset in self._scan():
+            yield GameRecord(self.buffer, offset)
+
+    def offsets(self):
+        """
+        Returns:
+            An array of the byte offsets of every complete record, built
+            once.
+        """
+        if self._offsets is None:
+            self._offsets = array('Q', self._scan())
+        return self._offsets
+
+    def __len__(self):
+        return len(self.offsets())
+
+    def __getitem__(self, index):
+        return GameRecord(self.buffer, self.offsets()[index])
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,73 @@
+"""
+Per-game random streams for tile spawns.
+
+Each Game owns a SpawnRandom, so a game is reproducible from its seed
+alone, whatever process plays it. spawn_seed derives independent game
+seeds from one base seed, so a batch of N games gives identical results
+on 1 worker or 64.
+"""
+import random
+from array import array
+
+_MASK64 = (1 << 64) - 1
+
+
+def spawn_seed(base_seed, index):
+    """
+    Derive the seed of game index from a base seed with splitmix64.
+
+    Returns:
+        A 64-bit int seed.
+    """
+    z = (base_seed * 0x9E3779B97F4A7C15 + (index + 1) * 0xBF58476D1CE4E5B9)
+    z &= _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+class SpawnRandom:
+    def __init__(self, seed=None, four_probability=0.5, buffer_size=256):
+        """
+        Args:
+            seed: Seed of the stream, fresh entropy if None
+            four_probability: Chance that a spawned tile is a 4
+            buffer_size: Number of 32-bit values drawn per refill
+        """
+        if not 0.0 <= four_probability <= 1.0:
+            raise ValueError('{} is not a valid probability!'.format(
+                four_probability))
+        self.seed = seed
+        self.random = None
+        self.four_threshold = int(four_probability * (1 << 32))
+        self.buffer_size = buffer_size
+        self.buffer = array('I')
+        self.position = 0
+
+    def _next(self):
+        if self.position >= len(self.buffer):
+            if self.random is None:
+                # Seeding is deferred until the first spawn
+                self.random = random.Random(self.seed)
+            # Draw a whole buffer of 32-bit values in one call
+            self.buffer = array('I')
+            self.buffer.frombytes(
+                self.random.randbytes(4 * self.buffer_size))
+            self.position = 0
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def randrange(self, n):
+        """
+        Returns:
+            A random int in [0, n).
+        """
+        return (self._next() * n) >> 32
+
+    def tile(self):
+        """
+        Returns:
+            The value of a spawned tile, 2 or 4.
+        """
+        return 4 if self._next() < self.four_threshold else 2
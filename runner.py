@@ -0,0 +1,254 @@
+"""
+Headless batch runner that plays many games across a process pool.
+
+Run it as a module, e.g.
+    python -m 2048.runner --games 1000 --policy bot --workers 8
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard
+from .expectimax import ExpectimaxBot
+from .main import Game
+from .policy_cache import CachedBot, PolicyCache
+from .rng import spawn_seed
+from .variants import get_shape
+
+GameResult = namedtuple("GameResult", ["steps", "max_tile", "won"])
+
+
+class PreferenceBot:
+    """
+    The bot_start strategy without printing.
+    Move preference: down > left > right > up
+    Immediately perform down if up is inevitably performed
+    """
+    ORDER = ("down", "left", "right", "up")
+
+    def __init__(self, shape=None):
+        """
+        Args:
+            shape: variants.Shape of the boards, 4x4 if None
+        """
+        self.after_up = False
+        self.execute_move = (shape or get_shape()).execute_move
+
+    def best_move(self, board):
+        execute_move = self.execute_move
+        if self.after_up:
+            self.after_up = False
+            if execute_move(board, "down")[0] != board:
+                return "down"
+        for direction in self.ORDER:
+            if execute_move(board, direction)[0] != board:
+                self.after_up = direction == "up"
+                return direction
+        return None
+
+
+class RandomBot:
+    """
+    Pick a uniformly random valid move.
+    """
+
+    def __init__(self, seed=None, shape=None):
+        """
+        Args:
+            seed: Seed of the move choices
+            shape: variants.Shape of the boards, 4x4 if None
+        """
+        self.random = random.Random(seed)
+        self.shape = shape or get_shape()
+
+    def best_move(self, board):
+        directions = [direction for direction, (moved, _)
+                      in zip(bitboard.DIRECTIONS,
+                             self.shape.successors(board))
+                      if moved != board]
+        return self.random.choice(directions) if directions else None
+
+
+def make_policy(name, depth=2, seed=None, four_probability=0.5):
+    """
+    Build a fresh bot by name, so policies can cross process boundaries.
+
+    Args:
+        name: One of bot, random, expectimax
+        depth: Search depth of the expectimax policy
+        seed: Seed of the random policy
+        four_probability: Spawn odds the expectimax policy plans for
+
+    Returns:
+        An object whose best_move(board) returns a direction.
+    """
+    if name == "bot":
+        return PreferenceBot()
+    if name == "random":
+        return RandomBot(seed)
+    if name == "expectimax":
+        return ExpectimaxBot(depth=depth, four_probability=four_probability)
+    raise ValueError('{} is not a valid policy!'.format(name))
+
+
+def play_game(bot, game=None, max_steps=None):
+    """
+    Play one game to the end without printing.
+
+    Args:
+        bot: Object whose best_move(board) returns a direction
+        game: Game to play, a freshly initialized one if None
+        max_steps: Stop after this many moves if set
+
+    Returns:
+        A GameResult.
+    """
+    if game is None:
+        game = Game()
+        game.initialize()
+    steps = 0
+    won = False
+    while max_steps is None or steps < max_steps:
+        direction = bot.best_move(game.board)
+        if direction is None or not game.move(direction):
+            break
+        steps += 1
+        game_over, _ = game.is_game_over()
+        if game_over:
+            won = game.max_rank >= game.win_rank
+            break
+    return GameResult(steps, bitboard.value(game.max_rank), won)
+
+
+_caches = {}
+
+
+def _open_cache(path):
+    # One read-only mapping per worker process, shared by its games
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = PolicyCache(path, readonly=True)
+        cache.warm()
+    return cache
+
+
+def _play_one(args):
+    policy, depth, seed, max_steps, four_probability, cache_path = args
+    game = Game(seed, four_probability)
+    game.initialize()
+    # The policy gets its own stream, not the one spawning the tiles
+    bot = make_policy(policy, depth,
+                      None if seed is None else spawn_seed(seed, 1),
+                      four_probability)
+    if cache_path:
+        bot = CachedBot(bot, _open_cache(cache_path))
+    return play_game(bot, game, max_steps)
+
+
+def run_games(n, policy="bot", workers=None, depth=2, seed=None,
+              max_steps=None, four_probability=0.5, policy_cache=None):
+    """
+    Play n games with a policy across a process pool.
+
+    Args:
+        n: Number of games
+        policy: Policy name, see make_policy
+        workers: Number of worker processes, os.cpu_count() if None,
+            1 to play in this process
+        depth: Search depth of the expectimax policy
+        seed: Base seed, game i is seeded with spawn_seed(seed, i), so
+            results do not depend on the number of workers
+        max_steps: Per-game move limit
+        four_probability: Chance that a spawned tile is a 4
+        policy_cache: Existing PolicyCache file consulted read-only by
+            every worker before asking the policy
+
+    Returns:
+        A tuple of the list of GameResult and the summary dict.
+    """
+    if policy_cache is not None:
+        # Fail once here rather than in every worker
+        if not os.path.isfile(policy_cache):
+            raise FileNotFoundError(
+                'policy cache {} does not exist, create it with '
+                'main.py --policy-cache first'.format(policy_cache))
+        PolicyCache(policy_cache, readonly=True).close()
+    workers = workers or os.cpu_count() or 1
+    jobs = [(policy, depth,
+             None if seed is None else spawn_seed(seed, index),
+             max_steps, four_probability, policy_cache)
+            for index in range(n)]
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_play_one(job) for job in jobs]
+    else:
+        chunksize = max(1, n // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_play_one, jobs,
+                                        chunksize=chunksize))
+    return results, summarize(results, time.perf_counter() - start)
+
+
+def summarize(results, seconds):
+    """
+    Aggregate per-game results.
+
+    Returns:
+        A dict with game and move counts, win rate, max tile histogram
+        and games/sec and moves/sec throughput.
+    """
+    moves = sum(result.steps for result in results)
+    tiles = {}
+    for result in results:
+        tiles[result.max_tile] = tiles.get(result.max_tile, 0) + 1
+    return {
+        "games": len(results),
+        "moves": moves,
+        "wins": sum(result.won for result in results),
+        "win_rate": (sum(result.won for result in results) /
+                     len(results) if results else 0.0),
+        "max_tiles": dict(sorted(tiles.items())),
+        "seconds": seconds,
+        "games_per_sec": len(results) / seconds if seconds else 0.0,
+        "moves_per_sec": moves / seconds if seconds else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play many 2048 games headless.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--policy", default="bot",
+                        choices=["bot", "random", "expectimax"])
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes, 0 for one per core")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-steps", type=int, default=None)
+    parser.add_argument("--four-probability", type=float, default=0.5)
+    parser.add_argument("--policy-cache", default=None,
+                        help="existing file of cached best moves, shared "
+                             "read-only by the workers")
+    parser.add_argument("--json", action="store_true",
+                        help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    _, summary = run_games(args.games, args.policy, args.workers or None,
+                           args.depth, args.seed, args.max_steps,
+                           args.four_probability, args.policy_cache)
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print("{games} games, {moves} moves, {wins} wins in "
+              "{seconds:.2f}s".format(**summary))
+        print("{games_per_sec:.1f} games/sec, "
+              "{moves_per_sec:.0f} moves/sec".format(**summary))
+        print("Max tiles: {}".format(summary["max_tiles"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Asyncio game server speaking newline-delimited JSON.
+
+One process hosts many Game sessions over TCP or a Unix socket. Every
+request is a JSON object on its own line and gets exactly one JSON
+response line on the same connection, in order:
+
+    {"op": "new", "seed": 1}
+        {"ok": true, "session": "1", "grid": [[...]], "score": 0, ...}
+    {"op": "move", "session": "1", "direction": "left"}
+        {"ok": true, "moved": true, "grid": [[...]], "score": 4, ...}
+    {"op": "state", "session": "1"}
+    {"op": "close", "session": "1"}
+    {"op": "metrics"}
+
+A request may carry an "id", which is echoed back. Failed requests get
+{"ok": false, "error": "..."}. Boards are 2 to 8 cells on a side and
+the win tile a power of two from 4 to 32768, so a request cannot make
+the server build huge move tables. Sessions idle for longer than the
+idle timeout are evicted. Each connection has at most max_pending requests
+read but not answered; past that the server stops reading from it, so a
+client that floods moves, or does not read its responses, is slowed
+down by TCP flow control instead of growing the server's buffers.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+from . import bitboard
+from .bitboard import DIRECTIONS
+from .main import Game
+from .metrics import LatencyRecorder
+
+# Board sides a client may ask for; every size builds tables kept for
+# the life of the process
+BOARD_SIDES = range(2, 9)
+
+
+class _Session:
+    __slots__ = ('game', 'last_active')
+
+    def __init__(self, game, now):
+        self.game = game
+        self.last_active = now
+
+
+class GameServer:
+    def __init__(self, idle_timeout=300.0, max_pending=64,
+                 max_sessions=100000):
+        """
+        Args:
+            idle_timeout: Seconds after which an unused session is evicted
+            max_pending: Requests buffered per connection before the
+                server stops reading from it
+            max_sessions: Number of live sessions, further new requests
+                are refused
+        """
+        self.idle_timeout = idle_timeout
+        self.max_pending = max_pending
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.latency = LatencyRecorder()
+        self.started = time.monotonic()
+        self.connections = 0
+        self.requests = 0
+        self.moves = 0
+        self.evicted = 0
+        self.errors = 0
+        self._server = None
+        self._evictor = None
+
+    def handle_request(self, request, now=None):
+        """
+        Run one decoded request.
+
+        Returns:
+            The response dict.
+        """
+        now = time.monotonic() if now is None else now
+        self.requests += 1
+        try:
+            op = request.get("op")
+            if op == "new":
+                response = self._new(request, now)
+            elif op in ("move", "state", "close"):
+                session = self._session(request, now)
+                response = getattr(self, '_' + op)(request, session)
+            elif op == "metrics":
+                response = self.metrics()
+            else:
+                raise ValueError('unknown op {!r}'.format(op))
+            response["ok"] = True
+        except (KeyError, TypeError, ValueError) as error:
+            self.errors += 1
+            message = error.args[0] if error.args else repr(error)
+            response = {"ok": False, "error": str(message)}
+        except Exception as error:
+            # A bug must not take the connection down with it
+            self.errors += 1
+            response = {"ok": False,
+                        "error": 'internal error: {!r}'.format(error)}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def _new(self, request, now):
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError('too many sessions')
+        rows = request.get("rows", 4)
+        cols = request.get("cols", 4)
+        win_tile = request.get("win_tile", 2048)
+        four_probability = request.get("four_probability", 0.5)
+        for name, side in (("rows", rows), ("cols", cols)):
+            if type(side) is not int or side not in BOARD_SIDES:
+                raise ValueError('{} must be an integer from {} to {}'.format(
+                    name, BOARD_SIDES[0], BOARD_SIDES[-1]))
+        if type(win_tile) is not int or win_tile < 4:
+            raise ValueError('{!r} is not a valid win tile'.format(win_tile))
+        bitboard.rank(win_tile)
+        if type(four_probability) not in (int, float) or \
+                not 0 <= four_probability <= 1:
+            raise ValueError('four_probability must be between 0 and 1')
+        game = Game(seed=request.get("seed"),
+                    four_probability=four_probability,
+                    rows=rows, cols=cols, win_tile=win_tile)
+        game.initialize()
+        session_id = str(next(self._ids))
+        self.sessions[session_id] = _Session(game, now)
+        response = self._state(request, self.sessions[session_id])
+        response["session"] = session_id
+        return response
+
+    def _session(self, request, now):
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise KeyError('unknown session')
+        session.last_active = now
+        return session
+
+    def _move(self, request, session):
+        direction = request.get("direction")
+        if direction not in DIRECTIONS:
+            raise ValueError('{!r} is not a valid direction'.format(
+                direction))
+        moved = session.game.move(direction)
+        self.moves += moved
+        response = self._state(request, session)
+        response["moved"] = moved
+        return response
+
+    def _state(self, request, session):
+        game = session.game
+        game_over, message = game.is_game_over()
+        return {"grid": game.shape.decode(game.board), "score": game.score,
+                "game_over": game_over, "message": message}
+
+    def _close(self, request, session):
+        del self.sessions[request["session"]]
+        return {}
+
+    def evict_idle(self, now=None):
+        """
+        Drop the sessions idle for longer than idle_timeout.
+
+        Returns:
+            The number of evicted sessions.
+        """
+        now = time.monotonic() if now is None else now
+        deadline = now - self.idle_timeout
+        idle = [session_id for session_id, session in self.sessions.items()
+                if session.last_active < deadline]
+        for session_id in idle:
+            del self.sessions[session_id]
+        self.evicted += len(idle)
+        return len(idle)
+
+    def metrics(self):
+        """
+        Returns:
+            A JSON-serializable dict of the server counters, the request
+            latency in seconds and the move throughput since start.
+        """
+        uptime = time.monotonic() - self.started
+        return {
+            "sessions": len(self.sessions),
+            "connections": self.connections,
+            "requests": self.requests,
+            "moves": self.moves,
+            "errors": self.errors,
+            "evicted": self.evicted,
+            "uptime": uptime,
+            "moves_per_sec": self.moves / uptime if uptime else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+    def handle_line(self, line):
+        """
+        Decode one request line and encode its response line.
+        """
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+        except (ValueError, RecursionError) as error:
+            # RecursionError comes from deeply nested arrays or objects
+            self.requests += 1
+            self.errors += 1
+            response = {"ok": False, "error": str(error)}
+        else:
+            response = self.handle_request(request)
+        try:
+            encoded = json.dumps(response).encode() + b'\n'
+        except (ValueError, RecursionError):
+            # An echoed id nested too deeply to encode again
+            self.errors += 1
+            encoded = b'{"ok": false, "error": "response too deep"}\n'
+        self.latency.record(time.perf_counter() - start)
+        return encoded
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve one client connection until it closes.
+        """
+        self.connections += 1
+        queue = asyncio.Queue(self.max_pending)
+        responder = asyncio.ensure_future(self._respond(queue, writer))
+        try:
+            while not responder.done():
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    # Reset by the peer, or a line over the stream limit
+                    break
+                if not line:
+                    break
+                if not await _enqueue(queue, line, responder):
+                    break
+        finally:
+            if not responder.done():
+                await _enqueue(queue, None, responder)
+            await asyncio.gather(responder, return_exceptions=True)
+            self.connections -= 1
+            writer.close()
+
+    async def _respond(self, queue, writer):
+        try:
+            while True:
+                line = await queue.get()
+                if line is None:
+                    return
+                writer.write(self.handle_line(line))
+                await writer.drain()
+        finally:
+            # When writing fails, closing the transport also ends the
+            # reader loop with an EOF
+            writer.close()
+
+    async def _evict_forever(self):
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 0.01))
+            self.evict_idle()
+
+    async def start(self, host=None, port=None, path=None):
+        """
+        Listen on a Unix socket if path is set, TCP otherwise.
+
+        Returns:
+            The listening asyncio.Server.
+        """
+        if path:
+            self._server = await asyncio.start_unix_server(
+                self.handle_connection, path)
+        else:
+            self._server = await asyncio.start_server(
+                self.handle_connection, host, port)
+        self._evictor = asyncio.ensure_future(self._evict_forever())
+        return self._server
+
+    async def close(self):
+        """
+        Stop listening and evicting.
+        """
+        if self._evictor is not None:
+            self._evictor.cancel()
+            await asyncio.gather(self._evictor, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+async def _enqueue(queue, item, responder):
+    # Wait for room in the queue, unless the responder task ends first
+    # and nothing would ever take the item. Returns True once queued.
+    if not queue.full():
+        queue.put_nowait(item)
+        return True
+    put = asyncio.ensure_future(queue.put(item))
+    await asyncio.wait((put, responder), return_when=asyncio.FIRST_COMPLETED)
+    if put.done():
+        return True
+    put.cancel()
+    return False
+
+
+async def _serve(args):
+    server = GameServer(args.idle_timeout, args.max_pending,
+                        args.max_sessions)
+    listener = await server.start(args.host, args.port, args.unix)
+    print("Listening on {}".format(args.unix or ", ".join(
+        str(sock.getsockname()) for sock in listener.sockets)))
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve 2048 sessions over newline-delimited JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2048)
+    parser.add_argument("--unix", default=None,
+                        help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--idle-timeout", type=float, default=300.0,
+                        help="seconds before an unused session is evicted")
+    parser.add_argument("--max-pending", type=int, default=64,
+                        help="unanswered requests per connection")
+    parser.add_argument("--max-sessions", type=int, default=100000)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
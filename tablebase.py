@@ -0,0 +1,447 @@
+"""
+Exact-solve tablebase for small boards.
+
+The tablebase holds, for every state reachable from a new game, the
+expected score still to be gained under optimal play. A state is
+terminal, with value 0, once it holds the win tile or has no move left.
+
+Every spawn adds 2 or 4 to the sum of the tiles and moves keep it, so
+states fall into layers by tile sum. generate enumerates the layers
+upwards, then solves them downwards, each layer from the two above it.
+Both passes split every layer across a process pool and store it in a
+work directory as soon as it is done, so an interrupted generation
+resumes from the last finished layer.
+
+The result is a single open-addressing hash file of packed boards and
+float32 values, opened by Tablebase through a read-only mmap, so lookups
+are O(1) and worker processes share one copy of the pages.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard
+from .variants import get_shape
+
+MAGIC = b'2048TBL1'
+# rows, cols, win rank, four probability, slot count, state count
+_HEADER = struct.Struct('<BBBxdQQ')
+_HEADER_SIZE = 64
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_WORD = (1 << 64) - 1
+_CHUNK = 4096
+
+
+class _Rules:
+    """
+    The board shape, win rank and spawn odds of one tablebase.
+    """
+
+    def __init__(self, rows, cols, win_rank, four_probability):
+        self.rows = rows
+        self.cols = cols
+        self.win_rank = win_rank
+        self.four_probability = four_probability
+        self.shape = get_shape(rows, cols)
+        if self.shape.bits > 64:
+            raise ValueError('a {}x{} board does not fit in 64 bits'.format(
+                rows, cols))
+
+    def params(self):
+        return {"rows": self.rows, "cols": self.cols,
+                "win_rank": self.win_rank,
+                "four_probability": self.four_probability}
+
+    def is_terminal(self, board):
+        shape = self.shape
+        return (shape.max_rank(board) >= self.win_rank or
+                not shape.can_move(board))
+
+    def afterstates(self, board):
+        """
+        Yields:
+            (direction, afterstate, score) of every move changing board.
+        """
+        for direction, (moved, score) in zip(bitboard.DIRECTIONS,
+                                             self.shape.successors(board)):
+            if moved != board:
+                yield direction, moved, score
+
+    def spawns(self, afterstate):
+        """
+        Yields:
+            (board, rank, probability) of every tile that can spawn.
+        """
+        mask = self.shape.empty_mask(afterstate)
+        cell_probability = 1.0 / mask.bit_count()
+        two = cell_probability * (1.0 - self.four_probability)
+        four = cell_probability * self.four_probability
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            yield afterstate | bit, 1, two
+            yield afterstate | bit * 2, 2, four
+
+    def expected(self, afterstate, lookup):
+        """
+        Returns:
+            The value of an afterstate, averaged over the spawns.
+        """
+        total = 0.0
+        for board, _, probability in self.spawns(afterstate):
+            if probability and not self.is_terminal(board):
+                total += probability * lookup(board)
+        return total
+
+    def starts(self):
+        """
+        Returns:
+            The boards Game.initialize can produce.
+        """
+        boards = set()
+        for first, _, first_probability in self.spawns(0):
+            for board, _, probability in self.spawns(first):
+                if (first_probability and probability and
+                        not self.is_terminal(board)):
+                    boards.add(board)
+        return boards
+
+
+def _tile_sum(board):
+    total = 0
+    while board:
+        nibble = board & 0xF
+        if nibble:
+            total += 1 << nibble
+        board >>= 4
+    return total
+
+
+def _layer_path(work_dir, kind, total):
+    return os.path.join(work_dir, '{}-{:07d}.bin'.format(kind, total))
+
+
+def _write_array(path, values):
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        values.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def _read_array(path, typecode):
+    values = array(typecode)
+    with open(path, 'rb') as f:
+        values.frombytes(f.read())
+    return values
+
+
+def _expand_chunk(job):
+    # Children of a chunk of non-terminal states, split by the spawned
+    # rank: rank 1 adds 2 to the tile sum, rank 2 adds 4
+    params, boards = job
+    rules = _Rules(**params)
+    children = (set(), set())
+    for board in boards:
+        for _, afterstate, _ in rules.afterstates(board):
+            for child, spawned, probability in rules.spawns(afterstate):
+                if probability and not rules.is_terminal(child):
+                    children[spawned - 1].add(child)
+    return children
+
+
+_worker_layers = {}
+
+
+def _layer_values(work_dir, total):
+    # Value lookup of a solved layer, cached per worker process
+    layer = _worker_layers.get((work_dir, total))
+    if layer is None:
+        if len(_worker_layers) > 4:
+            _worker_layers.clear()
+        states = _read_array(_layer_path(work_dir, 'states', total), 'Q')
+        values = _read_array(_layer_path(work_dir, 'values', total), 'd')
+        layer = _worker_layers[(work_dir, total)] = dict(zip(states, values))
+    return layer
+
+
+def _solve_chunk(job):
+    params, work_dir, total, boards = job
+    rules = _Rules(**params)
+    layers = {}
+    for spawned in (2, 4):
+        if os.path.exists(_layer_path(work_dir, 'values', total + spawned)):
+            layers[spawned] = _layer_values(work_dir, total + spawned)
+    two = layers.get(2, {})
+    four = layers.get(4, {})
+
+    def lookup(board):
+        # The tile sum of a child tells which layer holds it
+        return two[board] if board in two else four[board]
+
+    values = array('d')
+    for board in boards:
+        best = 0.0
+        for _, afterstate, score in rules.afterstates(board):
+            best = max(best, score + rules.expected(afterstate, lookup))
+        values.append(best)
+    return values
+
+
+def _chunks(values, size):
+    return [values[start:start + size]
+            for start in range(0, len(values), size)]
+
+
+def _map(executor, function, jobs):
+    if executor is None:
+        return [function(job) for job in jobs]
+    return list(executor.map(function, jobs))
+
+
+def generate(path, rows=3, cols=3, win_tile=2048, four_probability=0.5,
+             workers=None, work_dir=None, log=None):
+    """
+    Solve every reachable state and write the tablebase to path.
+
+    Args:
+        path: Output tablebase file
+        rows: Number of rows of the board
+        cols: Number of columns of the board
+        win_tile: Tile value that ends the game
+        four_probability: Chance that a spawned tile is a 4
+        workers: Number of worker processes, os.cpu_count() if None,
+            1 to solve in this process
+        work_dir: Directory of the finished layers, path + ".work" if
+            None; a generation with the same parameters resumes from it,
+            and it can be deleted once path is written
+        log: Function called with a progress line per layer, if set
+
+    Returns:
+        The number of states in the tablebase.
+    """
+    rules = _Rules(rows, cols, bitboard.rank(win_tile), four_probability)
+    params = rules.params()
+    work_dir = work_dir or path + '.work'
+    os.makedirs(work_dir, exist_ok=True)
+    params_path = os.path.join(work_dir, 'params.json')
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            if json.load(f) != params:
+                raise ValueError('{} holds layers of another tablebase!'
+                                 .format(work_dir))
+    else:
+        with open(params_path, 'w') as f:
+            json.dump(params, f)
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        totals = _enumerate(rules, work_dir, executor, log)
+        _solve(rules, work_dir, totals, executor, log)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return _write_table(path, rules, work_dir, totals)
+
+
+def _enumerate(rules, work_dir, executor, log):
+    # Find the reachable states layer by layer, upwards. A finished
+    # layer is only expanded again if the layers it feeds may be missing.
+    params = rules.params()
+    pending = {}
+    for board in rules.starts():
+        pending.setdefault(_tile_sum(board), set()).add(board)
+    done = sorted(int(name[7:14]) for name in os.listdir(work_dir)
+                  if name.startswith('states-') and name.endswith('.bin'))
+    last = done[-1] if done else 0
+    totals = []
+    total = 0
+    while pending or total <= last:
+        total += 2
+        layer_path = _layer_path(work_dir, 'states', total)
+        if os.path.exists(layer_path):
+            pending.pop(total, None)
+            states = _read_array(layer_path, 'Q')
+            expand = total >= last - 2
+        else:
+            states = array('Q', sorted(pending.pop(total, ())))
+            _write_array(layer_path, states)
+            expand = True
+        if states:
+            totals.append(total)
+        if expand and states:
+            jobs = [(params, chunk) for chunk in _chunks(states, _CHUNK)]
+            for twos, fours in _map(executor, _expand_chunk, jobs):
+                pending.setdefault(total + 2, set()).update(twos)
+                pending.setdefault(total + 4, set()).update(fours)
+            for key in [key for key, value in pending.items() if not value]:
+                del pending[key]
+        if log and states:
+            log('enumerated tile sum {}: {} states'.format(total, len(states)))
+    return totals
+
+
+def _solve(rules, work_dir, totals, executor, log):
+    # Solve the layers downwards from the largest tile sum
+    params = rules.params()
+    for total in reversed(totals):
+        values_path = _layer_path(work_dir, 'values', total)
+        if os.path.exists(values_path):
+            continue
+        states = _read_array(_layer_path(work_dir, 'states', total), 'Q')
+        jobs = [(params, work_dir, total, chunk)
+                for chunk in _chunks(states, _CHUNK)]
+        values = array('d')
+        for chunk_values in _map(executor, _solve_chunk, jobs):
+            values.extend(chunk_values)
+        _write_array(values_path, values)
+        if log:
+            log('solved tile sum {}: {} states'.format(total, len(states)))
+
+
+def _slot(board, bits):
+    return ((board * _HASH_MULTIPLIER) & _WORD) >> (64 - bits)
+
+
+def _write_table(path, rules, work_dir, totals):
+    count = 0
+    for total in totals:
+        count += os.path.getsize(_layer_path(work_dir, 'states', total)) // 8
+    # At most half full, so probe sequences stay short
+    bits = max(4, (2 * count).bit_length())
+    slots = 1 << bits
+    keys = array('Q', bytes(8 * slots))
+    values = array('f', bytes(4 * slots))
+    mask = slots - 1
+    for total in totals:
+        states = _read_array(_layer_path(work_dir, 'states', total), 'Q')
+        layer_values = _read_array(_layer_path(work_dir, 'values', total),
+                                   'd')
+        for board, value in zip(states, layer_values):
+            slot = _slot(board, bits)
+            while keys[slot]:
+                slot = (slot + 1) & mask
+            keys[slot] = board
+            values[slot] = value
+
+    header = MAGIC + _HEADER.pack(rules.rows, rules.cols, rules.win_rank,
+                                  rules.four_probability, slots, count)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(_HEADER_SIZE, b'\0'))
+        keys.tofile(f)
+        values.tofile(f)
+    os.replace(tmp_path, path)
+    return count
+
+
+class Tablebase:
+    def __init__(self, path):
+        """
+        Open a tablebase file as a read-only memory map.
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not a tablebase!'.format(path))
+        rows, cols, win_rank, four_probability, slots, count = \
+            _HEADER.unpack_from(self._mmap, len(MAGIC))
+        self.rules = _Rules(rows, cols, win_rank, four_probability)
+        self.shape = self.rules.shape
+        self.count = count
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._view = view = memoryview(self._mmap)
+        self._keys = view[_HEADER_SIZE:_HEADER_SIZE + 8 * slots].cast('Q')
+        self._values = view[_HEADER_SIZE + 8 * slots:
+                            _HEADER_SIZE + 12 * slots].cast('f')
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, board):
+        keys = self._keys
+        slot = _slot(board, self._bits)
+        while True:
+            key = keys[slot]
+            if key == board:
+                return slot
+            if not key:
+                return None
+            slot = (slot + 1) & self._mask
+
+    def __contains__(self, board):
+        return self._find(board) is not None
+
+    def value(self, board):
+        """
+        Returns:
+            The expected score still to be gained from board under
+            optimal play, 0.0 for terminal boards.
+
+        Raises:
+            KeyError: If board is not reachable from a new game.
+        """
+        if self.rules.is_terminal(board):
+            return 0.0
+        slot = self._find(board)
+        if slot is None:
+            raise KeyError(board)
+        return self._values[slot]
+
+    def move_values(self, board):
+        """
+        Returns:
+            A list of (value, direction) for every move changing board,
+            the value counting the move's own score.
+        """
+        rules = self.rules
+        return [(score + rules.expected(afterstate, self.value), direction)
+                for direction, afterstate, score in rules.afterstates(board)]
+
+    def best_move(self, board):
+        """
+        Pick the optimal move.
+
+        Returns:
+            One of up, down, left, right, or None if no move is possible.
+        """
+        moves = self.move_values(board)
+        return max(moves)[1] if moves else None
+
+    def close(self):
+        self._keys.release()
+        self._values.release()
+        self._view.release()
+        self._mmap.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Solve a small 2048 board exactly.")
+    parser.add_argument("output", help="tablebase file to write")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("--win-tile", type=int, default=2048)
+    parser.add_argument("--four-probability", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes, 0 for one per core")
+    parser.add_argument("--work-dir", default=None,
+                        help="directory of finished layers, reused to "
+                             "resume an interrupted run")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = generate(args.output, args.rows, args.cols, args.win_tile,
+                     args.four_probability, args.workers or None,
+                     args.work_dir, log=print)
+    print("{} states in {:.1f}s".format(count, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
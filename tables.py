@@ -0,0 +1,197 @@
+"""
+Precomputed move tables for every packed 16-bit row.
+
+For each of the 2 ** 16 rows the tables hold the row after a left and a
+right move, the score gained by the merges, whether the row changed and
+its largest tile.
+Up and down moves reuse them through bitboard.transpose, so any move is
+four table lookups.
+
+The tables are built on first use, or loaded from a cache file written
+by save_tables.
+"""
+import os
+from array import array
+
+ROW_COUNT = 1 << 16
+_MAGIC = b'2048ROWT\x02'
+_CACHE_ENV = 'GAME2048_TABLE_CACHE'
+
+
+class RowTables:
+    """
+    Container of the left/right row tables.
+
+    Attributes:
+        left: Row after a left move, indexed by packed row
+        right: Row after a right move, indexed by packed row
+        left_score: Score gained by a left move
+        right_score: Score gained by a right move
+        left_changed: 1 if a left move changes the row, 0 otherwise
+        right_changed: 1 if a right move changes the row, 0 otherwise
+        max_rank: Largest log2 nibble of the row
+    """
+    FIELDS = (('left', 'H'), ('right', 'H'),
+              ('left_score', 'I'), ('right_score', 'I'),
+              ('left_changed', 'B'), ('right_changed', 'B'),
+              ('max_rank', 'B'))
+
+    def __init__(self, **columns):
+        for name, typecode in self.FIELDS:
+            setattr(self, name, columns.get(name, array(typecode)))
+
+
+def compact_line(line):
+    """
+    Compact and merge a line of log2 ranks towards index 0, in place and
+    in a single pass. A tile merges at most once per move.
+
+    Args:
+        line: List of log2 ranks, 0 for an empty cell
+
+    Returns:
+        The score gained by the merges.
+    """
+    write = 0
+    pending = 0
+    score = 0
+    for read in range(len(line)):
+        tile = line[read]
+        if not tile:
+            continue
+        line[read] = 0
+        if tile == pending and tile < 15:
+            # Merge into the last written tile, which cannot merge again
+            line[write - 1] = tile + 1
+            score += 1 << (tile + 1)
+            pending = 0
+        else:
+            line[write] = tile
+            write += 1
+            pending = tile
+    return score
+
+
+_line = [0] * 4
+
+
+def slide_row_left(row):
+    """
+    Slide a packed 16-bit row towards column 0.
+    A tile merges at most once per move.
+
+    Args:
+        row: Packed row, column 0 in the lowest nibble
+
+    Returns:
+        A tuple of the packed row after the move and the score gained.
+    """
+    line = _line
+    for col in range(4):
+        line[col] = (row >> (4 * col)) & 0xF
+    score = compact_line(line)
+    return line[0] | line[1] << 4 | line[2] << 8 | line[3] << 12, score
+
+
+def reverse_row(row):
+    """
+    Mirror a packed 16-bit row, so right moves can reuse left moves.
+    """
+    return (((row & 0xF) << 12) | ((row & 0xF0) << 4) |
+            ((row >> 4) & 0xF0) | (row >> 12))
+
+
+def build_tables():
+    """
+    Compute the tables for all 2 ** 16 rows.
+
+    Returns:
+        A RowTables instance.
+    """
+    tables = RowTables()
+    tables.left = array('H', bytes(2 * ROW_COUNT))
+    tables.right = array('H', bytes(2 * ROW_COUNT))
+    tables.left_score = array('I', [0]) * ROW_COUNT
+    tables.right_score = array('I', [0]) * ROW_COUNT
+    tables.left_changed = array('B', bytes(ROW_COUNT))
+    tables.right_changed = array('B', bytes(ROW_COUNT))
+    tables.max_rank = array('B', bytes(ROW_COUNT))
+    for row in range(ROW_COUNT):
+        tables.max_rank[row] = max(row & 0xF, (row >> 4) & 0xF,
+                                   (row >> 8) & 0xF, row >> 12)
+        result, score = slide_row_left(row)
+        tables.left[row] = result
+        tables.left_score[row] = score
+        tables.left_changed[row] = result != row
+        # A right move is a left move of the mirrored row
+        mirrored = reverse_row(row)
+        tables.right[mirrored] = reverse_row(result)
+        tables.right_score[mirrored] = score
+        tables.right_changed[mirrored] = result != row
+    return tables
+
+
+def save_tables(tables, path):
+    """
+    Write the tables into a cache file.
+
+    Args:
+        tables: A RowTables instance
+        path: Path of the cache file
+    """
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        for name, _ in RowTables.FIELDS:
+            getattr(tables, name).tofile(f)
+    os.replace(tmp_path, path)
+
+
+def load_tables(path):
+    """
+    Read the tables from a cache file written by save_tables.
+
+    Args:
+        path: Path of the cache file
+
+    Returns:
+        A RowTables instance, or None if the file is missing or invalid.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            columns = {}
+            for name, typecode in RowTables.FIELDS:
+                column = array(typecode)
+                column.fromfile(f, ROW_COUNT)
+                columns[name] = column
+    except (OSError, EOFError):
+        return None
+    return RowTables(**columns)
+
+
+_tables = None
+
+
+def get_tables(cache_path=None):
+    """
+    Return the process-wide tables, building them on first use.
+
+    If cache_path (or the GAME2048_TABLE_CACHE environment variable) is
+    set, the tables are loaded from that file, and written there after
+    being built if it does not exist yet.
+
+    Returns:
+        A RowTables instance.
+    """
+    global _tables
+    if _tables is None:
+        cache_path = cache_path or os.environ.get(_CACHE_ENV)
+        tables = load_tables(cache_path) if cache_path else None
+        if tables is None:
+            tables = build_tables()
+            if cache_path:
+                save_tables(tables, cache_path)
+        _tables = tables
+    return _tables
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from . import bitboard
+from .main import Game
+
+np = pytest.importorskip("numpy")
+from .batch import BatchGame, move_boards  # noqa: E402
+
+
+def random_board():
+    grid = [[random.choice([0, 0, 2, 4, 8, 16]) for _ in range(4)]
+            for _ in range(4)]
+    return bitboard.encode(grid)
+
+
+def test_move_boards_matches_game():
+    # Every direction on random boards gives the same board, moved flag
+    # and score as the bitboard engine behind Game.move
+    random.seed(0)
+    boards = [random_board() for _ in range(500)]
+    for index, direction in enumerate(bitboard.DIRECTIONS):
+        games = BatchGame.from_boards(boards)
+        directions = np.full(len(boards), index)
+        result, changed, score = move_boards(games.boards, directions)
+        games.boards[...] = result
+        for board, after, moved, gained in zip(boards, games.to_boards(),
+                                               changed, score):
+            game = Game()
+            game.board = board
+            assert getattr(game, direction)() == moved
+            assert game.board == after
+            assert bitboard.execute_move(board, direction)[1] == gained
+
+
+def test_move_spawns_once():
+    # [0, 0, 0, 0]    [2, 4, 0, 0]  Plus a random cell
+    # [2, 4, 0, 0] => [0, 0, 0, 0]
+    # [0, 0, 0, 0]    [0, 0, 0, 0]
+    # [0, 0, 0, 0]    [0, 0, 0, 0]
+    board = bitboard.encode([[0, 0, 0, 0], [2, 4, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 0]])
+    games = BatchGame.from_boards([board, board], seed=1)
+    moved, _ = games.move(np.array([0, 2]))
+    assert list(moved) == [True, False]
+    assert (games.boards[0] > 0).sum() == 3
+    assert (games.boards[1] > 0).sum() == 2
+
+
+def test_initialize():
+    games = BatchGame(1000, seed=2)
+    games.initialize()
+    assert ((games.boards > 0).sum(axis=(1, 2)) == 2).all()
+    assert set(np.unique(games.boards)) <= {0, 1, 2}
+
+
+def test_is_game_over():
+    lost = bitboard.encode([[256, 128, 64, 32],
+                            [128, 64, 32, 16],
+                            [64, 32, 16, 8],
+                            [32, 16, 8, 4]])
+    won = bitboard.set_tile(0, 0, 0, 2048)
+    games = BatchGame.from_boards([0, lost, won])
+    done, win = games.is_game_over()
+    assert list(done) == [False, True, True]
+    assert list(win) == [False, False, True]
@@ -0,0 +1,24 @@
+from .bench import compare, mid_game_boards, run_benchmarks
+
+
+def test_mid_game_boards():
+    boards = mid_game_boards(50)
+    assert len(boards) == 50
+    assert boards == mid_game_boards(50)
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(board_count=8, repeat=1, games=1)
+    for name in ("up", "down", "left", "right", "is_game_over",
+                 "valid_move_exists", "empty_cells", "fill_empty_cell",
+                 "evaluate", "ntuple_best_move",
+                 "games", "game_moves", "game_moves_3x3", "game_moves_8x8"):
+        assert results[name] > 0
+
+
+def test_compare():
+    old = {"up": 100.0, "down": 100.0, "left": 100.0}
+    new = {"up": 95.0, "down": 50.0, "right": 10.0}
+    rows = compare(old, new, threshold=0.1)
+    assert [(row[0], row[4]) for row in rows] == [("down", True),
+                                                  ("up", False)]
@@ -0,0 +1,125 @@
+import pytest
+from . import bitboard
+from .main import Game
+
+
+def test_encode_decode():
+    # Case 1 - Round trip keeps every tile in place
+    grid = [[0, 2, 4, 8],
+            [16, 32, 64, 128],
+            [256, 512, 1024, 2048],
+            [4096, 8192, 16384, 32768]]
+    assert bitboard.decode(bitboard.encode(grid)) == grid
+
+    # Case 2 - Tile values must be powers of two that fit in a nibble
+    with pytest.raises(ValueError):
+        bitboard.rank(3)
+    with pytest.raises(ValueError):
+        bitboard.rank(65536)
+
+
+def test_transpose():
+    grid = [[0, 2, 4, 8],
+            [16, 32, 64, 128],
+            [256, 512, 1024, 2048],
+            [4096, 8192, 16384, 32768]]
+    transposed = [list(column) for column in zip(*grid)]
+    assert bitboard.decode(bitboard.transpose(bitboard.encode(grid))) \
+        == transposed
+
+
+def test_move_row_left():
+    # Case 1 - [2, 2, 2, 2] => [4, 4, 0, 0], a tile merges only once
+    row = 0x1111
+    assert bitboard.move_row_left(row) == 0x22
+
+    # Case 2 - [4, 2, 2, 0] => [4, 4, 0, 0]
+    row = 0x0112
+    assert bitboard.move_row_left(row) == 0x22
+
+    # Case 3 - [2, 4, 8, 16] cannot move
+    row = 0x4321
+    assert bitboard.move_row_left(row) == row
+
+
+def test_can_move():
+    # Case 1 - An empty cell allows a move
+    assert bitboard.can_move(0) is True
+
+    # Case 2 - Full board with equal neighbours in column 3 only
+    grid = [[2, 4, 2, 4],
+            [4, 2, 4, 8],
+            [2, 4, 2, 8],
+            [4, 2, 4, 2]]
+    assert bitboard.can_move(bitboard.encode(grid)) is True
+
+    # Case 3 - Equal tiles across the row boundary do not count
+    grid = [[2, 4, 2, 4],
+            [4, 2, 4, 2],
+            [2, 4, 2, 4],
+            [4, 2, 4, 2]]
+    assert bitboard.can_move(bitboard.encode(grid)) is False
+
+
+def test_grid_view():
+    # Case 1 - Writes through grid update the bitboard
+    game = Game()
+    game.grid[1][2] = 8
+    assert game.board == 3 << (4 * 6)
+
+    # Case 2 - Assigning a list of lists replaces the board
+    game.grid = [[2, 0, 0, 0]] + [[0] * 4 for _ in range(3)]
+    assert game.board == 1
+    assert game.grid == [[2, 0, 0, 0]] + [[0] * 4 for _ in range(3)]
+
+
+def test_successors():
+    # Case 1 - Every direction matches execute_move
+    grid = [[2, 2, 0, 4],
+            [0, 4, 4, 8],
+            [2, 0, 2, 8],
+            [16, 16, 32, 0]]
+    board = bitboard.encode(grid)
+    expected = tuple(bitboard.execute_move(board, direction)
+                     for direction in bitboard.DIRECTIONS)
+    assert bitboard.successors(board) == expected
+
+    # Case 2 - Game.successors reports changes without moving
+    game = Game()
+    game.grid = [[2, 4, 8, 16]] + [[0] * 4 for _ in range(3)]
+    before = game.board
+    result = {successor.direction: successor
+              for successor in game.successors()}
+    assert game.board == before
+    assert result["up"].changed is False
+    assert result["left"].changed is False
+    assert result["down"].changed is True
+    assert result["down"].score == 0
+    assert result["down"].board == bitboard.move_down(before)
+
+
+def test_game_metadata():
+    # Case 1 - Assigning the board recomputes the metadata
+    game = Game(seed=0)
+    game.grid = [[2, 2, 0, 4],
+                 [0, 0, 0, 0],
+                 [0, 0, 0, 0],
+                 [0, 0, 0, 1024]]
+    assert game.empty_mask == bitboard.empty_mask(game.board)
+    assert len(bitboard.empty_cells(game.board)) == 12
+    assert game.max_rank == bitboard.rank(1024)
+
+    # Case 2 - Moves and spawns keep the metadata in step with the board
+    for direction in ["left", "up", "right", "down"] * 5:
+        game.move(direction)
+        assert game.empty_mask == bitboard.empty_mask(game.board)
+        assert game.max_rank == bitboard.max_rank(game.board)
+    assert game.score > 0
+
+    # Case 3 - A merge into 2048 wins without a rescan
+    game.board = bitboard.encode([[1024, 1024, 0, 0]] +
+                                 [[0] * 4 for _ in range(3)])
+    game.score = 0
+    game.move("left")
+    assert game.score == 2048
+    assert game.is_game_over() == (True, "Game finishes, you win!")
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from . import bitboard
+
+np = pytest.importorskip("numpy")
+from .batch import BatchGame, legal_moves  # noqa: E402
+from .env import VectorEnv  # noqa: E402
+
+
+def test_legal_moves():
+    # Matches the bitboard engine on random boards
+    random.seed(1)
+    boards = [bitboard.encode([[random.choice([0, 2, 2, 4, 8])
+                                for _ in range(4)] for _ in range(4)])
+              for _ in range(300)]
+    masks = legal_moves(BatchGame.from_boards(boards).boards)
+    for board, mask in zip(boards, masks):
+        assert list(mask) == [bitboard.MOVES[direction](board) != board
+                              for direction in bitboard.DIRECTIONS]
+
+
+def test_reset_and_step():
+    env = VectorEnv(64, seed=0)
+    observations, legal = env.reset()
+    assert observations.shape == (64, 4, 4)
+    assert ((observations > 0).sum(axis=(1, 2)) == 2).all()
+
+    # Observations and masks are the same buffers at every step
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        actions = rng.integers(0, 4, size=64)
+        result = env.step(actions)
+        assert result[0] is observations
+        assert result[3] is legal
+        assert (env.rewards >= 0).all()
+
+
+def test_step_rewards_and_auto_reset():
+    lost = bitboard.encode([[256, 128, 64, 32],
+                            [128, 64, 32, 16],
+                            [64, 32, 16, 8],
+                            [32, 16, 2, 2]])
+    env = VectorEnv(2, seed=1)
+    env.games.boards[...] = BatchGame.from_boards([lost, lost]).boards
+
+    # Case 1 - Merging two 2s earns 4; the illegal move earns nothing
+    _, rewards, dones, _, info = env.step(np.array([2, 0]))
+    assert list(rewards) == [4.0, 0.0]
+
+    # Case 2 - A finished game is restarted and its last board reported
+    dead = bitboard.encode([[256, 128, 64, 32],
+                            [128, 64, 32, 16],
+                            [64, 32, 16, 8],
+                            [32, 16, 8, 4]])
+    env.games.boards[...] = BatchGame.from_boards([dead, lost]).boards
+    _, _, dones, legal, info = env.step(np.array([0, 0]))
+    assert list(dones) == [True, False]
+    assert info["final_observations"].shape[1:] == (4, 4)
+    assert (env.observations[0] > 0).sum() == 2
+    assert legal[0].any()
@@ -0,0 +1,47 @@
+import pytest
+
+from . import bitboard
+from .evaluation import Evaluator, evaluate, row_terms
+from .transposition import symmetries
+
+
+def test_row_terms():
+    # Case 1 - [0, 0, 0, 0]
+    terms = row_terms(0)
+    assert terms == {"empty": 4, "monotonicity": 0, "smoothness": 0,
+                     "merges": 0, "corner": 0}
+
+    # Case 2 - [2, 2, 4, 0], one merge pair, empty cells count as rank 0
+    terms = row_terms(0x0211)
+    assert terms["empty"] == 1
+    assert terms["merges"] == 2
+    assert terms["monotonicity"] == 2 ** 4 - 1
+    assert terms["smoothness"] == 1
+    assert terms["corner"] == 0
+
+    # Case 3 - [8, 2, 4, 0], the largest tile at an end
+    terms = row_terms(0x0213)
+    assert terms["corner"] == 3
+    assert terms["monotonicity"] == 2 ** 4 - 1
+
+
+def test_evaluator():
+    board = bitboard.encode([[1024, 512, 256, 128],
+                             [8, 16, 32, 64],
+                             [4, 2, 0, 0],
+                             [0, 0, 0, 2]])
+
+    # Case 1 - Matches the weighted sum of the row and column terms
+    evaluator = Evaluator({"base": 0.0, "monotonicity": 0.0,
+                           "smoothness": 0.0, "merges": 0.0,
+                           "corner": 0.0, "empty": 1.0})
+    # 5 empty cells counted once by the rows and once by the columns
+    assert evaluator(board) == 2 * 5
+
+    # Case 2 - Symmetric boards score the same
+    scores = {evaluate(symmetric) for symmetric in symmetries(board)}
+    assert len(scores) == 1
+
+    # Case 3 - Unknown weights are rejected
+    with pytest.raises(ValueError):
+        Evaluator({"emptiness": 1.0})
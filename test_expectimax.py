@@ -0,0 +1,67 @@
+from . import bitboard
+from .expectimax import ExpectimaxBot, IterativeDeepeningBot
+
+
+def test_best_move():
+    # Case 1 - The only merge is picked
+    # [0, 0, 0, 0]
+    # [0, 0, 0, 0]
+    # [2, 4, 8, 16]
+    # [4, 8, 32, 32]
+    board = bitboard.encode([[0, 0, 0, 0], [0, 0, 0, 0],
+                             [2, 4, 8, 16], [4, 8, 32, 32]])
+    bot = ExpectimaxBot(depth=1)
+    assert bot.best_move(board) in ("left", "right")
+
+    # Case 2 - No move is possible
+    board = bitboard.encode([[256, 128, 64, 32],
+                             [128, 64, 32, 16],
+                             [64, 32, 16, 8],
+                             [32, 16, 8, 4]])
+    assert bot.best_move(board) is None
+
+
+def test_nodes_per_second():
+    bot = ExpectimaxBot(depth=2)
+    assert bot.nodes_per_second() == 0.0
+    bot.best_move(bitboard.encode([[2, 0, 0, 0], [0, 0, 0, 0],
+                                   [0, 0, 0, 0], [0, 0, 0, 2]]))
+    assert bot.nodes > 0
+    assert bot.nodes_per_second() > 0
+
+
+def test_min_probability():
+    # Pruning unlikely chance nodes searches fewer nodes
+    board = bitboard.encode([[2, 0, 0, 2], [0, 4, 0, 0],
+                             [0, 0, 0, 0], [2, 0, 0, 0]])
+    full = ExpectimaxBot(depth=3)
+    pruned = ExpectimaxBot(depth=3, min_probability=0.05)
+    full.best_move(board)
+    pruned.best_move(board)
+    assert pruned.nodes < full.nodes
+
+
+def test_iterative_deepening():
+    board = bitboard.encode([[2, 0, 0, 2], [0, 4, 0, 0],
+                             [0, 0, 0, 0], [2, 0, 0, 0]])
+
+    # Case 1 - A generous budget completes the maximum depth
+    bot = IterativeDeepeningBot(time_limit=10, max_depth=2)
+    assert bot.best_move(board) is not None
+    assert bot.last_depth == 2
+
+    # Case 2 - An exhausted budget still returns a legal move
+    bot = IterativeDeepeningBot(time_limit=0, max_depth=4)
+    direction = bot.best_move(board)
+    assert bitboard.MOVES[direction](board) != board
+    assert bot.latency.count == 1
+
+
+def test_four_probability():
+    # The best move follows the spawn odds the search plans for
+    board = bitboard.encode([[2, 4, 0, 0], [8, 2, 4, 0],
+                             [32, 8, 4, 2], [64, 32, 16, 4]])
+    assert ExpectimaxBot(depth=2, four_probability=0.0).best_move(
+        board) == "down"
+    assert ExpectimaxBot(depth=2, four_probability=1.0).best_move(
+        board) == "right"
@@ -0,0 +1,63 @@
+import pytest
+
+from . import bitboard
+from .main import Game
+from .runner import PreferenceBot
+
+np = pytest.importorskip("numpy")
+from .export import TRANSITION_DTYPE, TransitionDataset, \
+    TransitionWriter, export_game, unpack_boards  # noqa: E402
+
+
+def test_unpack_boards():
+    grid = [[0, 2, 4, 8], [16, 32, 64, 128],
+            [256, 512, 1024, 2048], [4096, 8192, 16384, 32768]]
+    ranks = unpack_boards([bitboard.encode(grid)])
+    assert ranks.shape == (1, 4, 4)
+    assert ranks[0, 3, 3] == 15
+    assert ranks[0, 0, 1] == 1
+
+
+def test_export_game(tmp_path):
+    with TransitionWriter(str(tmp_path), shard_size=64) as writer:
+        game = Game(seed=0)
+        game.initialize()
+        steps = export_game(writer, PreferenceBot(), game)
+
+    dataset = TransitionDataset(str(tmp_path))
+    # Case 1 - Every move is one transition, in fixed-size shards
+    assert len(dataset) == steps
+    assert all(len(shard) == 64 for shard in dataset.shards()[:-1])
+    assert dataset.manifest["total"] == steps
+
+    # Case 2 - Transitions chain and the last one ends the game
+    for index in range(steps - 1):
+        assert dataset[index]["next_board"] == dataset[index + 1]["board"]
+    assert bool(dataset[-1]["done"]) is True
+    assert int(dataset[-1]["next_board"]) == game.board
+
+    # Case 3 - Shards are memory-mapped, not loaded
+    assert isinstance(dataset.shards()[0], np.memmap)
+
+    # Case 4 - Iteration yields the transitions, like indexing
+    transitions = list(dataset)
+    assert len(transitions) == len(dataset)
+    assert transitions[-1] == dataset[-1]
+
+
+def test_add_batch(tmp_path):
+    transitions = np.zeros(150, dtype=TRANSITION_DTYPE)
+    transitions["reward"] = np.arange(150)
+    with TransitionWriter(str(tmp_path), shard_size=100) as writer:
+        writer.add_batch(transitions)
+    dataset = TransitionDataset(str(tmp_path))
+    assert [len(shard) for shard in dataset.shards()] == [100, 50]
+    assert dataset[120]["reward"] == 120
+
+    # A second writer on the same directory appends new shards
+    with TransitionWriter(str(tmp_path), shard_size=100) as writer:
+        writer.add_batch(transitions[:30])
+    dataset = TransitionDataset(str(tmp_path))
+    assert [len(shard) for shard in dataset.shards()] == [100, 50, 30]
+    assert dataset.manifest["total"] == 180
+    assert dataset[120]["reward"] == 120
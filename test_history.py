@@ -0,0 +1,94 @@
+from . import bitboard
+from .bitboard import Board
+from .history import History
+from .main import Game
+
+
+def test_board():
+    board = Board.from_grid([[2, 2, 0, 0],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 0],
+                             [0, 0, 0, 4]])
+
+    # Case 1 - A Board is a packed int, equal and hashed as one
+    assert board == bitboard.encode(board.grid)
+    assert {board: 1}[int(board)] == 1
+    assert board.tile(3, 3) == 4
+
+    # Case 2 - Moves and edits return new boards
+    moved, score = board.move("left")
+    assert isinstance(moved, Board)
+    assert (moved.tile(0, 0), score) == (4, 4)
+    assert board.with_tile(1, 1, 8).tile(1, 1) == 8
+    assert board.tile(1, 1) == 0
+
+
+def play(game, moves):
+    # Play moves with the preference order of the bot, collecting the
+    # (board, score) of every position
+    positions = [(game.board, game.score)]
+    for _ in range(moves):
+        if not any(game.move(direction)
+                   for direction in ("down", "left", "right", "up")):
+            break
+        positions.append((game.board, game.score))
+    return positions
+
+
+def test_history():
+    game = Game(seed=1)
+    game.initialize()
+    game.history = history = History(game.board, game.score)
+    positions = play(game, 150)
+    assert len(history) == len(positions)
+
+    # Case 1 - Undo and redo replay boards and scores across keyframes
+    for expected in reversed(positions[:-1]):
+        assert history.undo() == expected
+    assert history.undo() is None
+    for expected in positions[1:]:
+        assert history.redo() == expected
+    assert history.redo() is None
+    assert history[-1] == positions[-1][0]
+    assert history[70] == positions[70][0]
+
+    # Case 2 - A new move drops the redo tail and its keyframes
+    for _ in range(100):
+        history.undo()
+    game.board, game.score = positions[-101]
+    tail = play(game, 3)
+    assert not history.can_redo()
+    assert len(history) == len(positions) - 100 + 3
+    assert history.current() == tail[-1]
+    assert history.undo() == tail[-2]
+
+
+def test_game_undo_redo():
+    game = Game(seed=3)
+    game.initialize()
+    game.history = History(game.board, game.score)
+    boards = [game.board]
+    for direction in ["left", "up", "right", "down"] * 3:
+        if game.move(direction):
+            boards.append(game.board)
+    score = game.score
+
+    # Case 1 - Undo walks back to the initial board
+    while game.undo():
+        pass
+    assert game.board == boards[0]
+    assert game.score == 0
+    assert game.empty_mask == bitboard.empty_mask(boards[0])
+
+    # Case 2 - Redo replays the same spawns
+    while game.redo():
+        pass
+    assert game.board == boards[-1]
+    assert game.score == score
+
+    # Case 3 - A long game stays within tens of kilobytes
+    history = History()
+    for step in range(10000):
+        history.record("left", 0, 1 << (4 * (step & 15)), step)
+    assert len(history) == 10001
+    assert history.nbytes() < 32 * 1024
@@ -0,0 +1,55 @@
+import json
+
+from .instrument import GameProfiler
+from .main import Game
+from .metrics import LatencyHistogram
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile_ns(50) == 0
+    for nanoseconds in (100, 100, 100, 5000):
+        histogram.record_ns(nanoseconds)
+    assert histogram.percentile_ns(50) == 128
+    assert histogram.percentile_ns(100) == 8192
+    assert histogram.snapshot()["buckets"] == {128: 3, 8192: 1}
+
+
+def test_attach_detach():
+    game = Game(seed=0)
+    profiler = GameProfiler()
+
+    # Case 1 - Attached games count and time their calls
+    profiler.attach(game)
+    game.initialize()
+    game.move("up")
+    game.move("down")
+    game.is_game_over()
+    assert profiler.counters["fill_empty_cell"] >= 1
+    assert profiler.counters["is_game_over"] == 1
+    assert profiler.counters["valid_move_exists"] == 1
+    assert profiler.histograms["up"].count == 1
+    assert profiler.histograms["down"].count == 1
+
+    # Case 2 - Detached games run the plain methods again
+    profiler.detach(game)
+    game.move("left")
+    assert profiler.histograms["left"].count == 0
+    assert "left" not in game.__dict__
+
+
+def test_dump_and_stream(tmp_path):
+    stream_path = tmp_path / "stream.jsonl"
+    profiler = GameProfiler(stream_path=str(stream_path), interval=0.0)
+    game = profiler.attach(Game(seed=1))
+    game.initialize()
+    game.move("up")
+
+    dump_path = tmp_path / "snapshot.json"
+    profiler.dump(str(dump_path))
+    snapshot = json.loads(dump_path.read_text())
+    assert snapshot["latency"]["up"]["count"] == 1
+
+    assert profiler.maybe_flush() is True
+    lines = stream_path.read_text().splitlines()
+    assert json.loads(lines[-1])["counters"] == profiler.counters
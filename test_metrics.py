@@ -0,0 +1,27 @@
+from .metrics import LatencyRecorder
+
+
+def test_percentile():
+    # Case 1 - Empty recorder
+    recorder = LatencyRecorder()
+    assert recorder.percentile(50) == 0.0
+
+    # Case 2 - Nearest-rank percentiles of 1..100 ms
+    for millis in range(1, 101):
+        recorder.record(millis / 1000)
+    assert recorder.percentile(50) == 0.05
+    assert recorder.percentile(99) == 0.099
+    assert recorder.percentile(100) == 0.1
+    summary = recorder.summary()
+    assert summary["count"] == 100
+    assert summary["max"] == 0.1
+
+
+def test_max_samples():
+    # Only the most recent samples are kept for percentiles
+    recorder = LatencyRecorder(max_samples=10)
+    for millis in range(20):
+        recorder.record(millis / 1000)
+    assert len(recorder.samples) == 10
+    assert recorder.percentile(0) == 0.01
+    assert recorder.count == 20
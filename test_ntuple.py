@@ -0,0 +1,66 @@
+import pytest
+
+from . import bitboard
+from .ntuple import NTupleNetwork, train
+from .transposition import symmetries
+
+
+def test_indices():
+    network = NTupleNetwork(patterns=((0, 1, 2, 3),))
+    board = bitboard.encode([[2, 4, 8, 16], [0, 0, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 0]])
+    indices = network.indices(board)
+    # One feature per symmetry, the identity reads row 0 as 0x4321
+    assert len(indices) == 8
+    assert indices[0] == 0x4321
+
+    # Every feature matches the pattern read cell by cell on its symmetry
+    network = NTupleNetwork()
+    board = 0xFEDCBA9876543210
+    expected = [offset + sum(((symmetric >> (4 * cell)) & 0xF)
+                             << (4 * position)
+                             for position, cell in enumerate(pattern))
+                for symmetric in symmetries(board)
+                for pattern, offset in zip(network.patterns,
+                                           network.offsets)]
+    assert list(network.indices(board)) == expected
+
+
+def test_update_and_value():
+    network = NTupleNetwork()
+    board = bitboard.encode([[2, 0, 0, 0], [0, 4, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 8]])
+    assert network.value(board) == 0.0
+    # Features shared by several symmetries are updated once per use
+    network.update(board, 4.0)
+    assert network.value(board) >= 4.0 - 1e-6
+
+
+def test_train():
+    network = NTupleNetwork()
+    scores = train(network, 3, seed=0)
+    assert len(scores) == 3
+    assert all(score > 0 for score in scores)
+    assert any(network.weights)
+
+
+def test_save_load(tmp_path):
+    network = NTupleNetwork()
+    train(network, 2, seed=1)
+    path = str(tmp_path / "weights.bin")
+    network.save(path)
+    board = bitboard.encode([[2, 2, 0, 0], [0, 4, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 8]])
+
+    # Case 1 - Shared memory-mapped weights are read-only
+    shared = NTupleNetwork.load(path)
+    assert shared.patterns == network.patterns
+    assert shared.value(board) == network.value(board)
+    assert shared.best_move(board) == network.best_move(board)
+    with pytest.raises(TypeError):
+        shared.update(board, 1.0)
+
+    # Case 2 - A private copy can keep training
+    private = NTupleNetwork.load(path, shared=False)
+    private.update(board, 1.0)
+    assert private.value(board) != network.value(board)
@@ -0,0 +1,24 @@
+from . import bitboard
+from .expectimax import ExpectimaxBot
+from .parallel import ParallelExpectimaxBot
+
+
+def test_parallel_matches_serial():
+    board = bitboard.encode([[2, 0, 0, 2], [0, 4, 0, 0],
+                             [0, 0, 8, 0], [2, 0, 0, 16]])
+    serial = ExpectimaxBot(depth=2)
+    expected = serial.best_move(board)
+    for split in ("moves", "spawns"):
+        with ParallelExpectimaxBot(depth=2, workers=2, split=split) as bot:
+            assert bot.best_move(board) == expected
+            assert bot.nodes == serial.nodes
+            assert bot.latency.count == 1
+
+
+def test_parallel_four_probability():
+    # Workers search the same spawn odds as the bot
+    board = bitboard.encode([[2, 4, 0, 0], [8, 2, 4, 0],
+                             [32, 8, 4, 2], [64, 32, 16, 4]])
+    with ParallelExpectimaxBot(depth=2, workers=2,
+                               four_probability=1.0) as bot:
+        assert bot.best_move(board) == "right"
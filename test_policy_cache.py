@@ -0,0 +1,112 @@
+import pytest
+
+from . import bitboard
+from .policy_cache import CachedBot, PolicyCache
+from .runner import run_games
+from .transposition import canonical_symmetry, mirror
+
+
+class _CountingBot:
+    depth = 2
+
+    def __init__(self):
+        self.calls = 0
+
+    def best_move(self, board):
+        self.calls += 1
+        return "left"
+
+
+class _DeepeningBot(_CountingBot):
+    # Reaches less than its max depth, like IterativeDeepeningBot
+    depth = 8
+    last_depth = 0
+
+    def best_move(self, board):
+        self.last_depth = 3
+        return super().best_move(board)
+
+
+def test_get_put(tmp_path):
+    path = str(tmp_path / 'moves.cache')
+    board = bitboard.encode([[2, 0, 0, 0], [4, 8, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 16]])
+    with PolicyCache(path, max_entries=64) as cache:
+        # Case 1 - Symmetric boards share the entry, moves are mapped
+        assert cache.get(board) is None
+        cache.put(board, "left", 3)
+        assert cache.get(board, 3) == "left"
+        assert cache.get(mirror(board), 2) == "right"
+
+        # Case 2 - Deeper requests miss, shallower results never win
+        assert cache.get(board, 4) is None
+        cache.put(board, "up", 1)
+        assert cache.get(board, 3) == "left"
+        assert cache.stats()["hits"] == 3
+        assert len(cache) == 1
+
+    # Case 3 - Entries persist and can be shared read-only
+    with PolicyCache(path, readonly=True) as cache:
+        assert cache.warm() >= 1
+        assert cache.get(board, 3) == "left"
+        cache.put(bitboard.encode([[2] * 4] * 4), "up", 5)
+        assert len(cache) == 1
+
+
+def test_eviction(tmp_path):
+    # A single bucket evicts its least recently used board
+    with PolicyCache(str(tmp_path / 'small.cache'), max_entries=8) as cache:
+        boards = [index + 1 for index in range(9)]
+        for board in boards[:8]:
+            cache.put(board, "up", 1)
+        assert cache.get(boards[0]) is not None
+        cache.put(boards[8], "up", 1)
+        assert cache.evictions == 1
+        assert len(cache) == 8
+        assert cache.get(boards[0]) is not None
+        assert cache.get(boards[1]) is None
+
+        # A reader seeing a new key before its entry misses
+        slot = list(cache._keys).index(canonical_symmetry(boards[0])[0])
+        cache._keys[slot] = canonical_symmetry(boards[1])[0]
+        assert cache.get(boards[1]) is None
+
+
+def test_cached_bot(tmp_path):
+    path = str(tmp_path / 'moves.cache')
+    board = bitboard.encode([[2, 2, 0, 0]] + [[0] * 4] * 3)
+
+    # Case 1 - Only misses reach the wrapped bot
+    bot = _CountingBot()
+    with PolicyCache(path) as cache:
+        cached = CachedBot(bot, cache)
+        assert cached.best_move(board) == "left"
+        assert cached.best_move(board) == "left"
+        assert bot.calls == 1
+        assert cached.depth == 2
+
+        # Case 2 - Iterative bots hit at the depth their searches reach
+        bot = _DeepeningBot()
+        cached = CachedBot(bot, cache)
+        other = bitboard.encode([[4, 4, 0, 0]] + [[0] * 4] * 3)
+        cached.best_move(other)
+        cached.best_move(other)
+        assert bot.calls == 1
+        assert CachedBot(bot, cache, min_depth=4).best_move(other) == "left"
+        assert bot.calls == 2
+
+        # Case 3 - A cached move that does not change the board is ignored
+        stuck = bitboard.encode([[2, 0, 0, 0]] + [[0] * 4] * 3)
+        cache.put(stuck, "up", 9)
+        bot = _CountingBot()
+        assert CachedBot(bot, cache).best_move(stuck) == "left"
+        assert bot.calls == 1
+
+    # Case 4 - Workers read the cache while playing
+    results, summary = run_games(2, policy="bot", workers=2, seed=0,
+                                 max_steps=20, policy_cache=path)
+    assert summary["moves"] == sum(result.steps for result in results) > 0
+
+    # Case 5 - A missing cache fails once, before any worker starts
+    with pytest.raises(FileNotFoundError):
+        run_games(2, workers=2, policy_cache=str(tmp_path / 'missing'))
@@ -0,0 +1,111 @@
+import pytest
+
+from .main import Game
+from .records import RecordReader, RecordWriter
+from .runner import PreferenceBot
+
+
+def play_recorded(writer, seed, moves):
+    game = Game(seed=seed)
+    game.initialize()
+    game.recorder = writer.start_game(game.board)
+    boards = [game.board]
+    scores = [game.score]
+    bot = PreferenceBot()
+    for _ in range(moves):
+        direction = bot.best_move(game.board)
+        if direction is None or not game.move(direction):
+            break
+        boards.append(game.board)
+        scores.append(game.score)
+    game.recorder.finish()
+    return boards, scores
+
+
+def test_write_and_replay(tmp_path):
+    path = str(tmp_path / "games.rec")
+    with RecordWriter(path) as writer:
+        expected = [play_recorded(writer, seed, 50 + seed)
+                    for seed in range(5)]
+
+    with RecordReader(path) as reader:
+        # Case 1 - Every game replays to the same boards
+        assert len(reader) == 5
+        for record, (boards, _) in zip(reader, expected):
+            assert len(record) == len(boards) - 1
+            assert list(record.boards()) == boards
+
+        # Case 2 - Random access rebuilds a Game at any step
+        record = reader[3]
+        boards, scores = expected[3]
+        game = record.game_at(10)
+        assert game.board == boards[10]
+        assert game.score == scores[10]
+        assert len(record.moves()) == len(record.spawns())
+        with pytest.raises(IndexError):
+            record.game_at(1000)
+
+
+def test_append(tmp_path):
+    path = str(tmp_path / "games.rec")
+    with RecordWriter(path) as writer:
+        play_recorded(writer, 0, 5)
+    with RecordWriter(path) as writer:
+        play_recorded(writer, 1, 5)
+    with RecordReader(path) as reader:
+        assert len(reader) == 2
+
+    # A crash while appending leaves a truncated record, which is skipped
+    with open(path, "ab") as f:
+        f.write(b"\x20\0\0\0\1\2\3")
+    with RecordReader(path) as reader:
+        assert len(reader) == 2
+        assert len(list(reader)) == 2
+
+    # The next writer cuts the truncated record off before appending
+    with RecordWriter(path) as writer:
+        boards, _ = play_recorded(writer, 2, 5)
+    with RecordReader(path) as reader:
+        assert len(reader) == 3
+        assert list(reader[2].boards()) == boards
+
+
+def test_variant_records(tmp_path):
+    # A 3x3 game replays through its own shape
+    path = str(tmp_path / "small.rec")
+    game = Game(seed=4, rows=3, cols=3, win_tile=256)
+    game.initialize()
+    with RecordWriter(path) as writer:
+        game.recorder = writer.start_game(game.board, game.shape, 256)
+        boards = [game.board]
+        bot = PreferenceBot(game.shape)
+        for _ in range(20):
+            direction = bot.best_move(game.board)
+            if direction is None or not game.move(direction):
+                break
+            boards.append(game.board)
+        game.recorder.finish()
+        with pytest.raises(ValueError):
+            writer.start_game(0, Game(rows=5, cols=5).shape)
+
+    with RecordReader(path) as reader:
+        record = reader[0]
+        assert list(record.boards()) == boards
+        replayed = record.game_at(len(record))
+        assert (replayed.shape.rows, replayed.shape.cols) == (3, 3)
+        assert replayed.win_rank == 8
+        assert (replayed.board, replayed.score) == (game.board, game.score)
+        assert all(row < 3 and col < 3 for row, col, _ in record.spawns())
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a record file")
+    with pytest.raises(ValueError):
+        RecordReader(str(path))
+    with pytest.raises(ValueError):
+        RecordWriter(str(path))
+
+    empty = tmp_path / "empty.rec"
+    empty.write_bytes(b"")
+    assert len(RecordReader(str(empty))) == 0
@@ -0,0 +1,39 @@
+import pytest
+
+from .main import Game
+from .rng import SpawnRandom, spawn_seed
+
+
+def test_spawn_seed():
+    # Distinct, deterministic seeds per game index
+    seeds = [spawn_seed(7, index) for index in range(1000)]
+    assert len(set(seeds)) == 1000
+    assert seeds == [spawn_seed(7, index) for index in range(1000)]
+    assert spawn_seed(7, 0) != spawn_seed(8, 0)
+
+
+def test_spawn_random():
+    # Case 1 - Same seed, same stream
+    first = SpawnRandom(3)
+    second = SpawnRandom(3)
+    assert [first.randrange(16) for _ in range(1000)] == \
+        [second.randrange(16) for _ in range(1000)]
+
+    # Case 2 - Values stay in range
+    assert {first.randrange(5) for _ in range(1000)} == set(range(5))
+
+    # Case 3 - The 4 probability is configurable
+    assert {SpawnRandom(1, 0.0).tile() for _ in range(100)} == {2}
+    assert {SpawnRandom(1, 1.0).tile() for _ in range(100)} == {4}
+    with pytest.raises(ValueError):
+        SpawnRandom(1, 1.5)
+
+
+def test_seeded_game():
+    # Games with the same seed replay the same spawns
+    games = [Game(seed=42), Game(seed=42)]
+    for game in games:
+        game.initialize()
+        for direction in ("down", "left", "up", "right") * 5:
+            game.move(direction)
+    assert games[0].board == games[1].board
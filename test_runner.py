@@ -0,0 +1,62 @@
+from . import bitboard, runner
+from .main import Game
+from .rng import spawn_seed
+from .runner import PreferenceBot, play_game, run_games
+
+
+def test_preference_bot():
+    bot = PreferenceBot()
+
+    # Case 1 - Down is preferred
+    board = bitboard.encode([[2, 0, 0, 0], [0, 0, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 0]])
+    assert bot.best_move(board) == "down"
+
+    # Case 2 - Up only when nothing else moves, then down right away
+    board = bitboard.encode([[0, 0, 0, 0], [2, 4, 8, 16],
+                             [4, 8, 16, 32], [8, 16, 32, 64]])
+    assert bot.best_move(board) == "up"
+    assert bot.best_move(bitboard.move_up(board)) == "down"
+
+
+def test_play_game():
+    # Case 1 - A game runs to its end
+    game = Game()
+    game.initialize()
+    result = play_game(PreferenceBot(), game)
+    assert result.steps > 0
+    assert result.max_tile >= 4
+    assert game.is_game_over()[0] is True
+
+    # Case 2 - max_steps stops early
+    result = play_game(PreferenceBot(), max_steps=3)
+    assert result.steps == 3
+
+
+def test_run_games():
+    results, summary = run_games(4, workers=1, seed=0)
+    assert len(results) == 4
+    assert summary["games"] == 4
+    assert summary["moves"] == sum(result.steps for result in results)
+    assert summary["moves_per_sec"] > 0
+
+    # Same seeds give the same games across a pool
+    pooled, _ = run_games(4, workers=2, seed=0)
+    assert pooled == results
+
+
+def test_play_one_policy(monkeypatch):
+    policies = []
+
+    def make_policy(*args):
+        policies.append(args)
+        return PreferenceBot()
+    monkeypatch.setattr(runner, "make_policy", make_policy)
+    runner._play_one(("expectimax", 2, 5, 3, 0.9, None))
+
+    # The policy gets its own seed, not the one of the tile spawns, and
+    # plans for the spawn odds of the game
+    assert policies == [("expectimax", 2, spawn_seed(5, 1), 0.9)]
+    monkeypatch.undo()
+    bot = runner.make_policy("expectimax", 1, four_probability=0.9)
+    assert bot.four_probability == 0.9
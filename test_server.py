@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from .loadgen import GameClient, fetch_metrics, run_load
+from .server import GameServer
+
+
+def test_handle_request():
+    server = GameServer(idle_timeout=10)
+
+    # Case 1 - New sessions start with two tiles
+    response = server.handle_request({"op": "new", "seed": 1, "id": 7},
+                                     now=0)
+    assert response["ok"] and response["id"] == 7
+    session = response["session"]
+    assert sum(1 for row in response["grid"] for tile in row if tile) == 2
+
+    # Case 2 - Moves report the new state
+    for direction in ("left", "right", "up", "down"):
+        response = server.handle_request(
+            {"op": "move", "session": session, "direction": direction},
+            now=1)
+        assert response["ok"]
+    assert server.moves >= 1
+
+    # Case 3 - Errors are reported, not raised
+    for request in ({"op": "move", "session": session, "direction": "x"},
+                    {"op": "move", "session": "nope", "direction": "up"},
+                    {"op": "dance"},
+                    {"op": "new", "win_tile": 3},
+                    {"op": "new", "win_tile": 1 << 20},
+                    {"op": "new", "rows": 2, "cols": 200000},
+                    {"op": "new", "rows": "4"},
+                    {"op": "new", "four_probability": 2}):
+        response = server.handle_request(request, now=1)
+        assert response["ok"] is False
+        assert response["error"]
+    assert json.loads(server.handle_line(b'[1]\n'))["ok"] is False
+    nested = b'[' * 100000 + b']' * 100000 + b'\n'
+    assert json.loads(server.handle_line(nested))["ok"] is False
+
+    # Case 4 - Idle sessions are evicted, active ones kept
+    other = server.handle_request({"op": "new"}, now=5)["session"]
+    assert server.evict_idle(now=12) == 1
+    assert list(server.sessions) == [other]
+    assert server.handle_request({"op": "close", "session": other})["ok"]
+    assert server.metrics()["sessions"] == 0
+
+
+def test_serve_load(tmp_path):
+    async def scenario():
+        server = GameServer(idle_timeout=60, max_pending=2)
+        await server.start(path=str(tmp_path / 'game.sock'))
+        try:
+            path = str(tmp_path / 'game.sock')
+            summary = await run_load(sessions=20, moves=30, concurrency=5,
+                                     path=path, seed=0)
+
+            # Pipelined requests are all answered, in order, even after
+            # a line too deeply nested to decode
+            client = await GameClient.connect(path=path)
+            lines = [{"op": "metrics", "id": index} for index in range(10)]
+            client.writer.write(b'[' * 30000 + b']' * 30000 + b'\n')
+            assert (await client.reader.readline()).startswith(
+                b'{"ok": false')
+            client.writer.write(b''.join(json.dumps(line).encode() + b'\n'
+                                         for line in lines))
+            responses = [json.loads(await client.reader.readline())
+                         for _ in lines]
+            await client.close()
+            return summary, responses, await fetch_metrics(path=path)
+        finally:
+            await server.close()
+
+    summary, responses, metrics = asyncio.run(scenario())
+    assert summary["sessions"] == 20
+    assert summary["moves"] > 0
+    assert summary["latency"]["count"] >= 40
+    assert [response["id"] for response in responses] == list(range(10))
+    assert metrics["moves"] == summary["moves"]
+    assert metrics["sessions"] == 0
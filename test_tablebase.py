@@ -0,0 +1,81 @@
+import os
+from functools import lru_cache
+
+import pytest
+
+from .tablebase import Tablebase, generate
+from .variants import get_shape
+
+
+def _solve(shape, win_rank):
+    # Plain recursive expectimax over the whole game tree
+    @lru_cache(maxsize=None)
+    def value(board):
+        if shape.max_rank(board) >= win_rank or not shape.can_move(board):
+            return 0.0
+        best = 0.0
+        for moved, score in shape.successors(board):
+            if moved == board:
+                continue
+            cells = shape.empty_cells(moved)
+            expected = 0.0
+            for row, col in cells:
+                for tile in (2, 4):
+                    expected += value(shape.set_tile(moved, row, col, tile))
+            best = max(best, score + 0.5 * expected / len(cells))
+        return best
+    return value
+
+
+def test_generate(tmp_path):
+    path = str(tmp_path / '2x2.tb')
+    count = generate(path, rows=2, cols=2, win_tile=32, workers=1)
+    table = Tablebase(path)
+    shape = get_shape(2, 2)
+    value = _solve(shape, 5)
+
+    # Case 1 - Every start board matches the recursive solution
+    start = shape.encode([[2, 0], [0, 4]])
+    assert len(table) == count
+    assert start in table
+    assert table.value(start) == pytest.approx(value(start), rel=1e-6)
+    for board in (shape.encode([[2, 2], [4, 0]]),
+                  shape.encode([[8, 4], [2, 0]])):
+        assert table.value(board) == pytest.approx(value(board), rel=1e-6)
+
+    # Case 2 - Terminal boards are worth nothing, unreachable ones fail
+    assert table.value(shape.encode([[32, 0], [0, 2]])) == 0.0
+    assert table.value(shape.encode([[2, 4], [4, 2]])) == 0.0
+    with pytest.raises(KeyError):
+        table.value(shape.encode([[16, 16], [16, 0]]))
+
+    # Case 3 - The best move has the best expected value
+    values = table.move_values(start)
+    assert table.best_move(start) == max(values)[1]
+    assert max(values)[0] == pytest.approx(table.value(start), rel=1e-6)
+    table.close()
+
+
+def test_generate_resume(tmp_path):
+    path = str(tmp_path / '3x3.tb')
+    work_dir = str(tmp_path / 'work')
+    generate(path, rows=3, cols=3, win_tile=8, workers=2,
+             work_dir=work_dir)
+    with open(path, 'rb') as f:
+        expected = f.read()
+
+    # Case 1 - Dropping the last layers of both passes resumes the run
+    names = sorted(os.listdir(work_dir))
+    states = [name for name in names if name.startswith('states-')]
+    values = [name for name in names if name.startswith('values-')]
+    for name in states[-3:] + values[:5]:
+        os.remove(os.path.join(work_dir, name))
+    os.remove(path)
+    generate(path, rows=3, cols=3, win_tile=8, workers=1,
+             work_dir=work_dir)
+    with open(path, 'rb') as f:
+        assert f.read() == expected
+
+    # Case 2 - Layers of other parameters are not reused
+    with pytest.raises(ValueError):
+        generate(path, rows=3, cols=3, win_tile=16, work_dir=work_dir)
@@ -0,0 +1,73 @@
+from . import bitboard
+from . import tables
+
+
+def test_compact_line():
+    # Case 1 - [2, 2, 2, 2] => [4, 4, 0, 0], each tile merges only once
+    line = [1, 1, 1, 1]
+    assert tables.compact_line(line) == 8
+    assert line == [2, 2, 0, 0]
+
+    # Case 2 - [4, 0, 4, 8, 8] => [8, 16, 0, 0, 0], any line length works
+    line = [2, 0, 2, 3, 3]
+    assert tables.compact_line(line) == 24
+    assert line == [3, 4, 0, 0, 0]
+
+
+def test_slide_row_left():
+    # Case 1 - [2, 2, 4, 4] => [4, 8, 0, 0], gains 4 + 8
+    assert tables.slide_row_left(0x2211) == (0x32, 12)
+
+    # Case 2 - [0, 0, 0, 2] => [2, 0, 0, 0], no merge
+    assert tables.slide_row_left(0x1000) == (0x1, 0)
+
+    # Case 3 - [32768, 32768, 0, 0] cannot merge past the largest nibble
+    assert tables.slide_row_left(0xFF) == (0xFF, 0)
+
+
+def test_build_tables():
+    row_tables = tables.get_tables()
+
+    # Case 1 - [0, 2, 2, 4] => left [4, 4, 0, 0], right [0, 0, 4, 4]
+    row = 0x2110
+    assert row_tables.left[row] == 0x22
+    assert row_tables.right[row] == 0x2200
+    assert row_tables.left_score[row] == 4
+    assert row_tables.right_score[row] == 4
+    assert row_tables.left_changed[row] == 1
+
+    # Case 2 - [2, 4, 0, 0] cannot move left but can move right
+    row = 0x21
+    assert row_tables.left_changed[row] == 0
+    assert row_tables.right_changed[row] == 1
+
+
+def test_save_load_tables(tmp_path):
+    # Case 1 - Tables survive a round trip through the cache file
+    path = str(tmp_path / 'tables.bin')
+    row_tables = tables.get_tables()
+    tables.save_tables(row_tables, path)
+    loaded = tables.load_tables(path)
+    for name, _ in tables.RowTables.FIELDS:
+        assert getattr(loaded, name) == getattr(row_tables, name)
+
+    # Case 2 - Missing or foreign files are ignored
+    assert tables.load_tables(str(tmp_path / 'missing.bin')) is None
+    (tmp_path / 'foreign.bin').write_bytes(b'not a table')
+    assert tables.load_tables(str(tmp_path / 'foreign.bin')) is None
+
+
+def test_execute_move():
+    # [2, 2, 0, 0]    [4, 0, 0, 0]
+    # [2, 0, 0, 0] => [2, 0, 0, 0]  with left, gains 4
+    # [0, 0, 0, 0]    [0, 0, 0, 0]
+    # [0, 0, 0, 0]    [0, 0, 0, 0]
+    board = bitboard.encode([[2, 2, 0, 0], [2, 0, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 0]])
+    moved, score = bitboard.execute_move(board, "left")
+    assert bitboard.decode(moved)[0][0] == 4
+    assert score == 4
+
+    moved, score = bitboard.execute_move(board, "up")
+    assert bitboard.decode(moved)[0] == [4, 2, 0, 0]
+    assert score == 4
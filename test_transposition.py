@@ -0,0 +1,90 @@
+from . import bitboard
+from .expectimax import ExpectimaxBot
+from .transposition import ENTRY_BYTES, INVERSE_MOVES, SYMMETRY_MOVES, \
+    TranspositionTable, canonical, canonical_symmetry, symmetries
+
+
+def test_symmetries():
+    grid = [[2, 4, 8, 16],
+            [32, 64, 128, 256],
+            [512, 1024, 2048, 4096],
+            [8192, 16384, 32768, 0]]
+    expected = []
+    for candidate in (grid, [list(row) for row in zip(*grid)]):
+        for rows in (candidate, candidate[::-1]):
+            expected.append(rows)
+            expected.append([row[::-1] for row in rows])
+    found = [bitboard.decode(board)
+             for board in symmetries(bitboard.encode(grid))]
+    assert sorted(found) == sorted(expected)
+
+
+def test_canonical():
+    # Every rotation and reflection maps to the same key
+    board = bitboard.encode([[2, 0, 0, 0], [4, 8, 0, 0],
+                             [0, 0, 0, 0], [0, 0, 0, 16]])
+    keys = {canonical(symmetric) for symmetric in symmetries(board)}
+    assert len(keys) == 1
+
+
+def test_symmetry_moves():
+    # A move on a board matches the mapped move on each symmetric form
+    board = bitboard.encode([[2, 0, 4, 0], [4, 8, 0, 2],
+                             [0, 2, 0, 0], [0, 0, 8, 16]])
+    for direction in bitboard.DIRECTIONS:
+        moved, _ = bitboard.execute_move(board, direction)
+        for index, (symmetric, expected) in enumerate(
+                zip(symmetries(board), symmetries(moved))):
+            mapped = SYMMETRY_MOVES[index][direction]
+            assert bitboard.execute_move(symmetric, mapped)[0] == expected
+            assert INVERSE_MOVES[index][mapped] == direction
+    key, index = canonical_symmetry(board)
+    assert key == canonical(board) == symmetries(board)[index]
+
+
+def test_get_put():
+    table = TranspositionTable()
+    board = bitboard.encode([[2, 0, 0, 0]] + [[0] * 4 for _ in range(3)])
+    corner = bitboard.set_tile(0, 3, 3, 2)
+
+    # Case 1 - Miss on an empty table
+    assert table.get(board, 1) is None
+
+    # Case 2 - A symmetric board hits the same entry
+    table.put(board, 2, 1.5)
+    assert table.get(corner, 2) == 1.5
+    assert table.get(corner, 1) == 1.5
+
+    # Case 3 - A shallower entry does not answer a deeper search
+    assert table.get(corner, 3) is None
+    assert table.stats()["hits"] == 2
+    assert table.stats()["misses"] == 2
+
+    # Case 4 - A shallower result does not replace a deeper one
+    table.put(board, 1, 9.0)
+    assert table.get(board, 2) == 1.5
+
+
+def test_eviction():
+    table = TranspositionTable(max_bytes=2 * ENTRY_BYTES)
+    first, second, third = (bitboard.set_tile(0, 0, 0, tile)
+                            for tile in (2, 4, 8))
+    table.put(first, 1, 1.0)
+    table.put(second, 1, 2.0)
+    table.get(first, 1)
+    table.put(third, 1, 3.0)
+    # The least recently used board is evicted
+    assert len(table) == 2
+    assert table.evictions == 1
+    assert table.get(second, 1) is None
+    assert table.get(first, 1) == 1.0
+
+
+def test_search_with_table():
+    board = bitboard.encode([[2, 0, 0, 2], [0, 4, 0, 0],
+                             [0, 0, 0, 0], [2, 0, 0, 0]])
+    plain = ExpectimaxBot(depth=2)
+    cached = ExpectimaxBot(depth=2, table=TranspositionTable())
+    assert plain.best_move(board) == cached.best_move(board)
+    assert cached.table.hits > 0
+    assert cached.nodes < plain.nodes
@@ -0,0 +1,112 @@
+from . import bitboard
+from .main import Game
+from .records import RecordReader, RecordWriter
+from .runner import PreferenceBot
+from .validate import validate_game, validate_games
+
+
+def submission(seed, moves=40):
+    # Play a seeded game and return its initial board, moves, spawns,
+    # score and max tile
+    game = Game(seed=seed)
+    game.initialize()
+    initial_board = game.board
+    bot = PreferenceBot()
+    directions, spawns, score = [], [], 0
+    for _ in range(moves):
+        direction = bot.best_move(game.board)
+        if direction is None:
+            break
+        moved, gained = bitboard.execute_move(game.board, direction)
+        game.move(direction)
+        cell = ((game.board ^ moved).bit_length() - 1) // 4
+        directions.append(direction)
+        spawns.append((cell // 4, cell % 4,
+                       bitboard.get_tile(game.board, cell // 4, cell % 4)))
+        score += gained
+    max_tile = bitboard.value(bitboard.max_rank(game.board))
+    return initial_board, directions, spawns, score, max_tile
+
+
+def test_validate_game():
+    initial_board, moves, spawns, score, max_tile = submission(0)
+
+    # Case 1 - An honest game is valid
+    result = validate_game(initial_board, moves, spawns, score, max_tile)
+    assert result.valid is True
+    assert result.score == score
+
+    # Case 2 - A wrong claim is rejected without an illegal step
+    result = validate_game(initial_board, moves, spawns, score + 4)
+    assert (result.valid, result.step) == (False, None)
+    assert result.reason == "score mismatch"
+
+    # Case 3 - A spawn on an occupied cell is caught at its step
+    moved = bitboard.MOVES[moves[0]](initial_board)
+    row, col = next((row, col) for row in range(4) for col in range(4)
+                    if bitboard.get_tile(moved, row, col))
+    bad_spawns = [(row, col, 2)] + spawns[1:]
+    result = validate_game(initial_board, moves, bad_spawns)
+    assert (result.valid, result.step) == (False, 0)
+    assert result.reason == "spawn on an occupied cell"
+
+    # Case 4 - A move that does not change the board is illegal
+    board = bitboard.encode([[2, 0, 0, 0]] + [[0] * 4 for _ in range(3)])
+    result = validate_game(board, ["left"], [(3, 3, 2)])
+    assert (result.valid, result.step) == (False, 0)
+    assert result.reason == "move does not change the board"
+
+
+def test_validate_malformed():
+    board = bitboard.encode([[1024, 1024, 0, 0]] +
+                            [[0] * 4 for _ in range(3)])
+
+    # Case 1 - Malformed spawns are rejected, not raised
+    for spawn in ((0,), ("1", 0, 2), (1, 0, 2.0), (True, 0, 2), None):
+        result = validate_game(board, ["left"], [spawn])
+        assert (result.valid, result.step) == (False, 0)
+        assert result.reason == "spawn is not three integers"
+    assert validate_game("board", [], []).valid is False
+    assert validate_game(board, None, None).valid is False
+    assert validate_game(board, [["left"]], [(3, 3, 2)]).reason == \
+        "unknown direction"
+
+    # Case 2 - No move may follow the win tile
+    result = validate_game(board, ["left", "right", "left"],
+                           [(3, 3, 2), (3, 2, 2), (3, 1, 2)])
+    assert (result.valid, result.step) == (False, 1)
+    assert result.reason == "move after the game was won"
+    assert result.max_tile == 2048
+    assert validate_game(board, ["left"], [(3, 3, 2)]).valid is True
+
+    # Case 3 - One bad submission does not fail the batch
+    submissions = [submission(0), (board, ["left"]), (board, 5, 5)]
+    results = validate_games(submissions, workers=2)
+    assert [result.valid for result in results] == [True, False, False]
+
+
+def test_validate_records(tmp_path):
+    # Games archived by records.py validate as they are
+    path = str(tmp_path / "games.rec")
+    with RecordWriter(path) as writer:
+        game = Game(seed=3)
+        game.initialize()
+        game.recorder = writer.start_game(game.board)
+        for _ in range(30):
+            game.move(PreferenceBot().best_move(game.board))
+        game.recorder.finish()
+    with RecordReader(path) as reader:
+        record = reader[0]
+        result = validate_game(record.initial_board, record.moves(),
+                               record.spawns())
+    assert result.valid is True
+
+
+def test_validate_games():
+    submissions = [submission(seed) for seed in range(6)]
+    initial_board, moves, spawns, score, max_tile = submissions[2]
+    submissions[2] = (initial_board, moves, spawns, score, max_tile * 2)
+    results = validate_games(submissions, workers=2)
+    assert [result.valid for result in results] == \
+        [True, True, False, True, True, True]
+    assert results == validate_games(submissions, workers=1)
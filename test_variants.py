@@ -0,0 +1,85 @@
+import pytest
+
+from . import bitboard
+from .main import Game
+from .runner import PreferenceBot, play_game
+from .variants import get_shape, reverse_line, slide_line
+
+
+def test_slide_line():
+    # Case 1 - [2, 2, 4, 4, 8] => [4, 8, 8, 0, 0], gains 4 + 8
+    assert slide_line(0x32211, 5) == (0x332, 12)
+
+    # Case 2 - Reversing keeps the width
+    assert reverse_line(0x321, 3) == 0x123
+    assert reverse_line(0x00001, 5) == 0x10000
+
+
+def test_shape_moves():
+    shape = get_shape(3, 5)
+    grid = [[2, 2, 0, 4, 4],
+            [0, 2, 0, 0, 8],
+            [2, 0, 4, 0, 8]]
+    board = shape.encode(grid)
+    assert shape.decode(board) == grid
+    transposed = get_shape(5, 3).decode(shape.transpose(board))
+    assert transposed == [list(col) for col in zip(*grid)]
+
+    # Case 1 - Rows slide through the line tables
+    moved, score = shape.execute_move(board, "left")
+    assert shape.decode(moved) == [[4, 8, 0, 0, 0],
+                                   [2, 8, 0, 0, 0],
+                                   [2, 4, 8, 0, 0]]
+    assert score == 12
+
+    # Case 2 - Columns slide on the transposed board
+    moved, score = shape.execute_move(board, "up")
+    assert shape.decode(moved) == [[4, 4, 4, 4, 4],
+                                   [0, 0, 0, 0, 16],
+                                   [0, 0, 0, 0, 0]]
+    assert score == 4 + 4 + 16
+
+    # Case 3 - successors matches execute_move
+    assert shape.successors(board) == tuple(
+        shape.execute_move(board, direction)
+        for direction in bitboard.DIRECTIONS)
+
+
+def test_shape_checks():
+    shape = get_shape(3, 3)
+
+    # Case 1 - Equal tiles across the row boundary do not count
+    grid = [[2, 4, 2],
+            [4, 2, 4],
+            [2, 4, 2]]
+    board = shape.encode(grid)
+    assert shape.can_move(board) is False
+    assert shape.empty_cells(board) == []
+    assert shape.max_rank(board) == 2
+
+    # Case 2 - Equal vertical neighbours in the last column
+    grid[2][2] = 4
+    assert shape.can_move(shape.encode(grid)) is True
+
+    # Case 3 - The 4x4 shape is the bitboard
+    assert get_shape(4, 4).execute_move is bitboard.execute_move
+    with pytest.raises(ValueError):
+        get_shape(1, 4)
+
+
+def test_variant_game():
+    # Case 1 - A 3x3 game wins at its own target tile
+    game = Game(seed=0, rows=3, cols=3, win_tile=16)
+    game.grid = [[8, 8, 0], [0, 0, 0], [0, 0, 0]]
+    assert game.move("left")
+    assert game.grid[0][0] == 16
+    assert game.is_game_over() == (True, "Game finishes, you win!")
+
+    # Case 2 - Bigger boards play whole games
+    for rows, cols in ((5, 5), (6, 6), (8, 8)):
+        game = Game(seed=1, rows=rows, cols=cols)
+        game.initialize()
+        result = play_game(PreferenceBot(game.shape), game, max_steps=200)
+        assert result.steps == 200
+        assert len(game.grid) == rows and len(game.grid[0]) == cols
+        assert game.empty_mask == game.shape.empty_mask(game.board)
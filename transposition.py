@@ -0,0 +1,168 @@
+"""
+Bounded transposition table for search bots.
+
+Boards are keyed on their canonical form under the eight rotations and
+reflections of the grid, so symmetric positions share one entry. This
+assumes the search value of a board is symmetry invariant, which holds
+for evaluations that score every row and column alike.
+"""
+from collections import OrderedDict
+
+from .bitboard import DIRECTIONS, transpose
+
+# Rough cost of one entry: OrderedDict slot, int key and value tuple
+ENTRY_BYTES = 200
+
+
+def mirror(board):
+    """
+    Returns:
+        The board reflected left to right.
+    """
+    board = (((board & 0x0F0F0F0F0F0F0F0F) << 4) |
+             ((board >> 4) & 0x0F0F0F0F0F0F0F0F))
+    return (((board & 0x00FF00FF00FF00FF) << 8) |
+            ((board >> 8) & 0x00FF00FF00FF00FF))
+
+
+def flip(board):
+    """
+    Returns:
+        The board reflected top to bottom.
+    """
+    board = (((board & 0x0000FFFF0000FFFF) << 16) |
+             ((board >> 16) & 0x0000FFFF0000FFFF))
+    return (((board & 0x00000000FFFFFFFF) << 32) |
+            ((board >> 32) & 0x00000000FFFFFFFF))
+
+
+def symmetries(board):
+    """
+    Returns:
+        The eight boards equivalent to board under rotation and reflection.
+    """
+    mirrored = mirror(board)
+    flipped = flip(board)
+    rotated = flip(mirrored)
+    return (board, mirrored, flipped, rotated,
+            transpose(board), transpose(mirrored),
+            transpose(flipped), transpose(rotated))
+
+
+def _compose(*swaps):
+    # Direction permutation applying each of swaps in turn
+    moves = {}
+    for direction in DIRECTIONS:
+        moved = direction
+        for swap in swaps:
+            moved = swap.get(moved, moved)
+        moves[direction] = moved
+    return moves
+
+
+_MIRROR = {"left": "right", "right": "left"}
+_FLIP = {"up": "down", "down": "up"}
+_TRANSPOSE = {"up": "left", "left": "up", "down": "right", "right": "down"}
+
+# SYMMETRY_MOVES[i][direction] is the move on symmetries(board)[i] that
+# matches direction on board, and INVERSE_MOVES[i] maps it back
+SYMMETRY_MOVES = (
+    _compose(), _compose(_MIRROR), _compose(_FLIP),
+    _compose(_MIRROR, _FLIP), _compose(_TRANSPOSE),
+    _compose(_MIRROR, _TRANSPOSE), _compose(_FLIP, _TRANSPOSE),
+    _compose(_MIRROR, _FLIP, _TRANSPOSE),
+)
+INVERSE_MOVES = tuple({moved: direction for direction, moved in moves.items()}
+                      for moves in SYMMETRY_MOVES)
+
+
+def canonical_symmetry(board):
+    """
+    Returns:
+        A tuple of the canonical form of board and the index into
+        symmetries(board) it was found at.
+    """
+    forms = symmetries(board)
+    key = min(forms)
+    return key, forms.index(key)
+
+
+def canonical(board):
+    """
+    Returns:
+        The smallest of the eight symmetric forms of board.
+    """
+    return min(symmetries(board))
+
+
+class TranspositionTable:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        Initiate an empty table with LRU eviction.
+
+        Args:
+            max_bytes: Approximate memory cap of the table
+        """
+        self.capacity = max(1, max_bytes // ENTRY_BYTES)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, board, depth):
+        """
+        Look up the value of a board searched at least depth deep.
+
+        Args:
+            board: Packed board
+            depth: Depth the caller is about to search
+
+        Returns:
+            The stored value, or None on a miss.
+        """
+        key = canonical(board)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < depth:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, board, depth, value):
+        """
+        Store the value of a board searched depth deep.
+        A shallower result never replaces a deeper one.
+        """
+        key = canonical(board)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            if entry[0] > depth:
+                return
+        self.entries[key] = (depth, value)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters.
+        """
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns:
+            A dict of the hit/miss/eviction counters and the table size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+        }
@@ -0,0 +1,131 @@
+"""
+Replay validator for submitted games.
+
+A submission is a starting board, its move sequence and the spawn log,
+optionally with the final score and max tile the client claims. Games
+are replayed on the bitboard in one call each, and batches are spread
+across a process pool. Submissions are untrusted: malformed input is
+rejected with a reason, never raised, and play must stop at the win
+tile.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bitboard
+
+ValidationResult = namedtuple(
+    "ValidationResult", ["valid", "step", "reason", "score", "max_tile"])
+
+
+def validate_game(initial_board, moves, spawns, score=None, max_tile=None,
+                  win_tile=2048):
+    """
+    Replay one game and check every step.
+
+    Args:
+        initial_board: Packed board before the first move
+        moves: Sequence of directions
+        spawns: Sequence of (row, col, tile) spawned after each move
+        score: Claimed final score, not checked if None
+        max_tile: Claimed max tile, not checked if None
+        win_tile: Tile value that ends the game, no move may follow it
+
+    Returns:
+        A ValidationResult. step is the index of the first illegal move,
+        or None for valid games and mismatched claims.
+    """
+    if not _is_int(initial_board) or not 0 <= initial_board < 1 << 64:
+        return ValidationResult(False, None, "initial board is not a "
+                                "64-bit board", 0, 0)
+    try:
+        lengths_differ = len(moves) != len(spawns)
+    except TypeError:
+        return ValidationResult(False, None, "moves and spawns are not "
+                                "sequences", 0, 0)
+    if lengths_differ:
+        return ValidationResult(False, None, "moves and spawns differ in "
+                                "length", 0, 0)
+    win_rank = bitboard.rank(win_tile)
+    board = initial_board
+    won = bitboard.max_rank(board) >= win_rank
+    total = 0
+    execute_move = bitboard.execute_move
+    for step, (direction, spawn) in enumerate(zip(moves, spawns)):
+        if won:
+            return _reject(step, "move after the game was won", total,
+                           board)
+        try:
+            moved, gained = execute_move(board, direction)
+        except (TypeError, ValueError):
+            return _reject(step, "unknown direction", total, board)
+        if moved == board:
+            return _reject(step, "move does not change the board", total,
+                           board)
+        if not isinstance(spawn, (tuple, list)) or len(spawn) != 3 or \
+                not all(_is_int(field) for field in spawn):
+            return _reject(step, "spawn is not three integers", total,
+                           moved)
+        row, col, tile = spawn
+        if not 0 <= row < 4 or not 0 <= col < 4:
+            return _reject(step, "spawn outside the grid", total, moved)
+        shift = 4 * (4 * row + col)
+        if (moved >> shift) & bitboard.CELL_MASK:
+            return _reject(step, "spawn on an occupied cell", total, moved)
+        if tile not in (2, 4):
+            return _reject(step, "spawned tile is not 2 or 4", total, moved)
+        board = moved | bitboard.rank(tile) << shift
+        total += gained
+        won = bitboard.max_rank(board) >= win_rank
+
+    final_tile = bitboard.value(bitboard.max_rank(board))
+    if score is not None and score != total:
+        return ValidationResult(False, None, "score mismatch", total,
+                                final_tile)
+    if max_tile is not None and max_tile != final_tile:
+        return ValidationResult(False, None, "max tile mismatch", total,
+                                final_tile)
+    return ValidationResult(True, None, "", total, final_tile)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _reject(step, reason, score, board):
+    return ValidationResult(False, step, reason, score,
+                            bitboard.value(bitboard.max_rank(board)))
+
+
+def _validate_submission(submission):
+    # One malformed submission must not fail the whole batch
+    try:
+        return validate_game(*submission)
+    except Exception as error:
+        return ValidationResult(False, None, "malformed submission: "
+                                "{!r}".format(error), 0, 0)
+
+
+def validate_games(submissions, workers=None, chunksize=None):
+    """
+    Validate a batch of games across a process pool.
+
+    Args:
+        submissions: Iterable of validate_game argument tuples
+            (initial_board, moves, spawns[, score[, max_tile]])
+        workers: Number of worker processes, os.cpu_count() if None,
+            1 to validate in this process
+        chunksize: Games sent to a worker at once
+
+    Returns:
+        A list of ValidationResult in submission order.
+    """
+    submissions = list(submissions)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [_validate_submission(submission)
+                for submission in submissions]
+    chunksize = chunksize or max(1, len(submissions) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_validate_submission, submissions,
+                                 chunksize=chunksize))
@@ -0,0 +1,353 @@
+"""
+Packed boards of any size, for variants other than 4x4.
+
+A rows x cols board is packed into one int of 4-bit log2 nibbles like
+the bitboard: cell [row, col] lives at bit offset 4 * (cols * row + col).
+Tiles are capped at 2 ** 15 as on the 4x4 board.
+
+Moves never loop over cells. Each row is looked up in a line table: a
+dense table of every line when it has at most four cells, a lazily
+filled cache of the lines seen so far otherwise. Up and down moves run
+the same tables on the transposed board, which is built by spreading
+16-bit chunks of every row through a precomputed table. The 4x4 shape
+is served by the bitboard module itself.
+"""
+from . import bitboard
+from .bitboard import _has_zero_nibble, rank, value
+from .tables import ROW_COUNT, compact_line, get_tables
+
+# Line caches are cleared when they grow past this many lines
+_CACHE_LIMIT = 1 << 20
+
+
+def slide_line(line, width):
+    """
+    Slide a packed line of width nibbles towards nibble 0.
+
+    Returns:
+        A tuple of the packed line after the move and the score gained.
+    """
+    cells = [(line >> (4 * index)) & 0xF for index in range(width)]
+    score = compact_line(cells)
+    result = 0
+    for index, cell in enumerate(cells):
+        result |= cell << (4 * index)
+    return result, score
+
+
+def reverse_line(line, width):
+    """
+    Mirror a packed line of width nibbles.
+    """
+    result = 0
+    for index in range(width):
+        result = result << 4 | (line >> (4 * index)) & 0xF
+    return result
+
+
+class _LineCache(dict):
+    """
+    Map packed lines to (line, score) after a move, computing each entry
+    the first time it is looked up.
+    """
+
+    def __init__(self, slide):
+        super().__init__()
+        self.slide = slide
+
+    def __missing__(self, line):
+        if len(self) >= _CACHE_LIMIT:
+            self.clear()
+        entry = self[line] = self.slide(line)
+        return entry
+
+
+class LineTable:
+    """
+    Left and right moves of packed lines of one width.
+
+    Attributes:
+        left: Maps a packed line to (line, score) after a left move
+        right: Maps a packed line to (line, score) after a right move
+    """
+
+    def __init__(self, width):
+        self.width = width
+        if width <= 4:
+            count = 1 << (4 * width)
+            self.left = [slide_line(line, width) for line in range(count)]
+            self.right = [self._slide_right(line) for line in range(count)]
+        else:
+            self.left = _LineCache(lambda line: slide_line(line, width))
+            self.right = _LineCache(self._slide_right)
+
+    def _slide_right(self, line):
+        width = self.width
+        result, score = slide_line(reverse_line(line, width), width)
+        return reverse_line(result, width), score
+
+
+_line_tables = {}
+_spread_tables = {}
+
+
+def get_line_table(width):
+    """
+    Return the process-wide LineTable of a width, building it on first
+    use.
+    """
+    table = _line_tables.get(width)
+    if table is None:
+        table = _line_tables[width] = LineTable(width)
+    return table
+
+
+def get_spread_table(height):
+    """
+    Return the table that spreads the four nibbles of a 16-bit chunk
+    4 * height bits apart, building it on first use.
+    """
+    table = _spread_tables.get(height)
+    if table is None:
+        step = 4 * height
+        table = [0] * ROW_COUNT
+        for chunk in range(ROW_COUNT):
+            table[chunk] = ((chunk & 0xF) |
+                            ((chunk >> 4) & 0xF) << step |
+                            ((chunk >> 8) & 0xF) << (2 * step) |
+                            (chunk >> 12) << (3 * step))
+        _spread_tables[height] = table
+    return table
+
+
+def _nibble_mask(cells):
+    # The lowest bit of each of the cells nibbles
+    return int('1' * cells, 16) if cells else 0
+
+
+class Shape:
+    def __init__(self, rows, cols):
+        """
+        Args:
+            rows: Number of rows, at least 2
+            cols: Number of columns, at least 2
+        """
+        if rows < 2 or cols < 2:
+            raise ValueError('a board needs at least 2 rows and 2 columns, '
+                             'got {}x{}'.format(rows, cols))
+        self.rows = rows
+        self.cols = cols
+        self.cells = rows * cols
+        self.bits = 4 * self.cells
+        self.row_mask = (1 << (4 * cols)) - 1
+        self.col_mask = (1 << (4 * rows)) - 1
+        self.low_bits = _nibble_mask(self.cells)
+        # Cells with a right neighbour and cells with one below
+        self.horizontal_mask = _nibble_mask(cols - 1) * sum(
+            1 << (4 * cols * row) for row in range(rows))
+        self.vertical_mask = _nibble_mask(cols * (rows - 1))
+        self._init_lines()
+
+    def _init_lines(self):
+        rows, cols = self.rows, self.cols
+        self._row_lines = get_line_table(cols)
+        self._col_lines = get_line_table(rows)
+        self._row_shifts = [4 * cols * row for row in range(rows)]
+        self._col_shifts = [4 * rows * col for col in range(cols)]
+        self._spread_rows = get_spread_table(rows)
+        self._spread_cols = get_spread_table(cols)
+        self._transpose_chunks = _chunks(rows, cols)
+        self._untranspose_chunks = _chunks(cols, rows)
+
+    def __repr__(self):
+        return 'Shape({}, {})'.format(self.rows, self.cols)
+
+    def encode(self, grid):
+        """
+        Pack a rows x cols list of tile values into a board.
+        """
+        board = 0
+        for row in range(self.rows):
+            for col in range(self.cols):
+                board |= rank(grid[row][col]) << (4 * (self.cols * row + col))
+        return board
+
+    def decode(self, board):
+        """
+        Unpack a board into a rows x cols list of tile values.
+        """
+        return [[value((board >> (4 * (self.cols * row + col))) & 0xF)
+                 for col in range(self.cols)] for row in range(self.rows)]
+
+    def get_tile(self, board, row, col):
+        """
+        Read the tile value at [row, col].
+        """
+        return value((board >> (4 * (self.cols * row + col))) & 0xF)
+
+    def set_tile(self, board, row, col, tile):
+        """
+        Write the tile value at [row, col].
+
+        Returns:
+            The updated board.
+        """
+        shift = 4 * (self.cols * row + col)
+        return (board & ~(0xF << shift)) | (rank(tile) << shift)
+
+    def transpose(self, board):
+        """
+        Returns:
+            The cols x rows board with rows and columns swapped.
+        """
+        spread = self._spread_rows
+        result = 0
+        for source, mask, target in self._transpose_chunks:
+            result |= spread[(board >> source) & mask] << target
+        return result
+
+    def _untranspose(self, transposed):
+        spread = self._spread_cols
+        result = 0
+        for source, mask, target in self._untranspose_chunks:
+            result |= spread[(transposed >> source) & mask] << target
+        return result
+
+    def _slide_rows(self, board, table, shifts, mask):
+        result = 0
+        score = 0
+        for shift in shifts:
+            line, gained = table[(board >> shift) & mask]
+            result |= line << shift
+            score += gained
+        return result, score
+
+    def execute_move(self, board, direction):
+        """
+        Apply a move and report the score gained by its merges.
+
+        Returns:
+            A tuple of the board after the move and the score gained.
+        """
+        if direction == "left" or direction == "right":
+            table = getattr(self._row_lines, direction)
+            return self._slide_rows(board, table, self._row_shifts,
+                                    self.row_mask)
+        if direction == "up" or direction == "down":
+            table = self._col_lines.left if direction == "up" \
+                else self._col_lines.right
+            moved, score = self._slide_rows(self.transpose(board), table,
+                                            self._col_shifts, self.col_mask)
+            return self._untranspose(moved), score
+        raise ValueError('{} is not a valid direction!'.format(direction))
+
+    def successors(self, board):
+        """
+        Apply all four moves at once, sharing the transpose between them.
+
+        Returns:
+            A tuple of (board, score) pairs in DIRECTIONS order.
+        """
+        transposed = self.transpose(board)
+        up, up_score = self._slide_rows(transposed, self._col_lines.left,
+                                        self._col_shifts, self.col_mask)
+        down, down_score = self._slide_rows(
+            transposed, self._col_lines.right, self._col_shifts,
+            self.col_mask)
+        return ((self._untranspose(up), up_score),
+                (self._untranspose(down), down_score),
+                self._slide_rows(board, self._row_lines.left,
+                                 self._row_shifts, self.row_mask),
+                self._slide_rows(board, self._row_lines.right,
+                                 self._row_shifts, self.row_mask))
+
+    def empty_mask(self, board):
+        """
+        Returns:
+            A mask with the lowest bit of every empty cell's nibble set.
+        """
+        occupied = board | board >> 1
+        occupied |= occupied >> 2
+        return ~occupied & self.low_bits
+
+    def empty_cells(self, board):
+        """
+        Returns:
+            A list of (row, col) of every empty cell.
+        """
+        cells = []
+        mask = self.empty_mask(board)
+        while mask:
+            bit = mask & -mask
+            cells.append(divmod(bit.bit_length() >> 2, self.cols))
+            mask ^= bit
+        return cells
+
+    def max_rank(self, board):
+        """
+        Returns:
+            The largest log2 nibble on the board.
+        """
+        table = get_tables().max_rank
+        return max(table[(board >> shift) & 0xFFFF]
+                   for shift in range(0, self.bits, 16))
+
+    def can_move(self, board):
+        """
+        Scan the board for an empty cell or two equal neighbours.
+
+        Returns:
+            True if any of the four moves changes the board.
+        """
+        return (_has_zero_nibble(board, self.low_bits) or
+                _has_zero_nibble(board ^ (board >> 4),
+                                 self.horizontal_mask) or
+                _has_zero_nibble(board ^ (board >> (4 * self.cols)),
+                                 self.vertical_mask))
+
+
+def _chunks(height, width):
+    # (source shift, mask, target shift) of every chunk of up to four
+    # cells of a row, for transposing a height x width board
+    chunks = []
+    for row in range(height):
+        for col in range(0, width, 4):
+            cells = min(4, width - col)
+            chunks.append((4 * (width * row + col), (1 << (4 * cells)) - 1,
+                           4 * (height * col + row)))
+    return chunks
+
+
+class _BitboardShape(Shape):
+    """
+    The 4x4 shape, served by the table-driven bitboard module.
+    """
+
+    def _init_lines(self):
+        pass
+
+    encode = staticmethod(bitboard.encode)
+    decode = staticmethod(bitboard.decode)
+    get_tile = staticmethod(bitboard.get_tile)
+    set_tile = staticmethod(bitboard.set_tile)
+    transpose = staticmethod(bitboard.transpose)
+    execute_move = staticmethod(bitboard.execute_move)
+    successors = staticmethod(bitboard.successors)
+    empty_mask = staticmethod(bitboard.empty_mask)
+    empty_cells = staticmethod(bitboard.empty_cells)
+    max_rank = staticmethod(bitboard.max_rank)
+    can_move = staticmethod(bitboard.can_move)
+
+
+_shapes = {}
+
+
+def get_shape(rows=4, cols=4):
+    """
+    Return the shared Shape of a board size.
+    """
+    shape = _shapes.get((rows, cols))
+    if shape is None:
+        cls = _BitboardShape if (rows, cols) == (4, 4) else Shape
+        shape = _shapes[(rows, cols)] = cls(rows, cols)
+    return shape